@@ -6,29 +6,211 @@ Orbital Sharded Storage - Fault-Tolerant Distributed File System
 """
 
 import argparse
+import bisect
+import ctypes
+import gc
+import os
 import sys
 from pathlib import Path
 import json
 import hashlib
+import mmap
 import shutil
 import random
+import threading
 import time
-from typing import List, Dict, Optional, Tuple
+import zlib
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, partial
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
 
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (OSError, TypeError):  # no process-wide libc handle (e.g. Windows)
+    _libc = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used without it
+    orjson = None
+
+try:
+    import blake3
+except ImportError:  # optional; sha256 and blake2b are always available
+    blake3 = None
+
 # Configuration
 BASE_DIR = Path.cwd() / "fs_lite_data"
 NODES_DIR = BASE_DIR / "nodes"
 METADATA_FILE = BASE_DIR / "metadata.json"
+METADATA_WAL = BASE_DIR / "metadata.wal"
 NODE_STATE_FILE = BASE_DIR / "nodes_state.json"
+VERIFIED_LOG = BASE_DIR / "verified.log"
+VERIFIED_CACHE_SIZE = 65536  # replicas remembered as verified since they last changed
+UPLOAD_WINDOW_SIZE = 4 * 1024 * 1024  # bytes hashed and flushed per upload window
+COPY_FILE_RANGE_MIN = 64 * 1024  # smaller replicas are cheaper to write than to clone
+PREFETCH_CHUNKS = 32  # chunk fetches kept in flight during a download
+RING_VNODES = 128  # virtual points per node on the consistent-hash ring
+WAL_COMPACT_RATIO = 2  # compact once the metadata WAL is this many times its live records
+WAL_COMPACT_MIN = 64 * 1024  # ...and is at least this many bytes
 
 def ensure_dir(p: Path):
     """Create directory if it doesn't exist"""
     p.mkdir(parents=True, exist_ok=True)
 
-def sha256_bytes(data: bytes) -> str:
-    """Calculate SHA-256 hash for integrity verification"""
-    return hashlib.sha256(data).hexdigest()
+def sha256_file(path, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file streamed through one reusable block buffer"""
+    h = hashlib.sha256()
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
+    return h.hexdigest()
+
+# Chunk checksum algorithms by the name recorded in file metadata. Files
+# without a "checksum" entry predate the choice and use sha256.
+CHECKSUMS = {
+    "sha256": hashlib.sha256,
+    "blake2b": partial(hashlib.blake2b, digest_size=32),
+}
+if blake3 is not None:
+    CHECKSUMS["blake3"] = blake3.blake3
+DEFAULT_CHECKSUM = "blake3" if blake3 is not None else "sha256"
+
+# Empty contexts; copying one is cheaper than constructing a new one
+_HASH_TEMPLATES = {name: new() for name, new in CHECKSUMS.items()}
+_GIL_RELEASE_MIN = 2048  # hashlib drops the GIL for buffers at least this large
+# Below this the GIL-held part of each hash (context copy, hexdigest)
+# rivals the GIL-free part and extra lanes mostly contend for the lock
+LANE_CHUNK_MIN = 2 * _GIL_RELEASE_MIN
+HASH_LANES = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+LANE_BATCH_MIN = 8  # smaller batches are hashed on the calling thread
+
+def checksum_bytes(data, algo: str = "sha256") -> str:
+    """Hex checksum of a bytes-like object with one of CHECKSUMS"""
+    h = _HASH_TEMPLATES[algo].copy()
+    h.update(data)
+    return h.hexdigest()
+
+def _hash_serial(chunks, algo: str = "sha256") -> List[str]:
+    """Hash chunks one after another on the calling thread"""
+    new_ctx = _HASH_TEMPLATES[algo].copy
+    hashes = []
+    for c in chunks:
+        h = new_ctx()
+        h.update(c)
+        hashes.append(h.hexdigest())
+    return hashes
+
+@lru_cache(maxsize=1)
+def _lane_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=HASH_LANES, thread_name_prefix="hash-lane")
+
+def _hash_lanes(chunks, algo: str) -> List[str]:
+    """Split the batch into one contiguous slice per core and hash them concurrently"""
+    per_lane = -(-len(chunks) // HASH_LANES)
+    slices = [chunks[i:i + per_lane] for i in range(0, len(chunks), per_lane)]
+    parts = _lane_pool().map(_hash_serial, slices, [algo] * len(slices))
+    return [h for part in parts for h in part]
+
+def checksum_batch(chunks, algo: str = "sha256") -> List[str]:
+    """Hash a batch of independent chunks, returning hex digests in order
+
+    OpenSSL already dispatches each call to SHA-NI, AVX2 or scalar code
+    by CPUID; this picks between the calling thread and one lane per core
+    from the shape of the batch.
+    """
+    if HASH_LANES > 1 and len(chunks) >= LANE_BATCH_MIN and len(chunks[0]) >= LANE_CHUNK_MIN:
+        return _hash_lanes(chunks, algo)
+    return _hash_serial(chunks, algo)
+
+def digest_batch(chunks, algo: str = "sha256") -> Tuple[List[str], List[int]]:
+    """Checksums and CRC-32s for a batch of chunks, as two parallel lists
+
+    The checksum is the authoritative at-rest record; the CRC-32 is a
+    cheap check for accidental corruption.
+    """
+    return checksum_batch(chunks, algo), list(map(zlib.crc32, chunks))
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic garbage collector while building large acyclic structures
+
+    Every few hundred container allocations CPython runs a collection
+    that also walks the long-lived metadata; the chunk records built
+    during an upload contain no cycles, so those passes are pure cost.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+_seek_lock = threading.Lock()
+
+def pwrite_all(fd: int, data, offset: int):
+    """Write all of data at offset, leaving the file position alone where pwrite exists"""
+    view = memoryview(data)
+    if not hasattr(os, "pwrite"):
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while view:
+                view = view[os.write(fd, view):]
+        return
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+def sync_filesystem(path: Path):
+    """Flush all dirty data on the filesystem holding path with one call
+
+    Uses syncfs(2) where libc provides it, otherwise a global sync().
+    """
+    syncfs = getattr(_libc, "syncfs", None) if _libc is not None else None
+    if syncfs is None:
+        os.sync()
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if syncfs(fd) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+    finally:
+        os.close(fd)
+
+@lru_cache(maxsize=256)
+def _hash_base(filename: str):
+    """64-bit BLAKE2b context with the "<filename>:" prefix already absorbed (copy before use)"""
+    return hashlib.blake2b(f"{filename}:".encode(), digest_size=8)
+
+def json_dumps(data, indent: bool = True) -> bytes:
+    """Serialize to JSON (indented unless indent=False), using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(data, indent=2).encode("utf-8")
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def json_loads(raw: bytes):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """Append count bytes of src_fd at offset to dst_fd with copy_file_range"""
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+def _sendfile_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """Append count bytes of src_fd at offset to dst_fd with sendfile"""
+    return os.sendfile(dst_fd, src_fd, offset, count)
 
 def format_bytes(size: int) -> str:
     """Convert bytes to human-readable format"""
@@ -38,6 +220,192 @@ def format_bytes(size: int) -> str:
         size /= 1024.0
     return f"{size:.2f} TB"
 
+def parse_erasure(value: str) -> Tuple[int, int]:
+    """Parse a K,M erasure spec from the command line"""
+    k, _, m = value.partition(",")
+    try:
+        return int(k), int(m)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K,M (e.g. 4,2), got {value!r}")
+
+# GF(2^8) log/antilog tables over the 0x11d polynomial, for Reed-Solomon
+_GF_EXP = [0] * 510
+_GF_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    _GF_EXP[_i] = _GF_EXP[_i + 255] = _x
+    _GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11d
+del _x, _i
+
+def _gf_mul(a: int, b: int) -> int:
+    if not a or not b:
+        return 0
+    return _GF_EXP[_GF_LOG[a] + _GF_LOG[b]]
+
+def _gf_inv(a: int) -> int:
+    return _GF_EXP[255 - _GF_LOG[a]]
+
+@lru_cache(maxsize=256)
+def _gf_mul_table(c: int) -> bytes:
+    """bytes.translate table multiplying every byte by c"""
+    return bytes(_gf_mul(c, x) for x in range(256))
+
+def _gf_invert(matrix: List[List[int]]) -> List[List[int]]:
+    """Invert a square GF(2^8) matrix by Gauss-Jordan elimination"""
+    n = len(matrix)
+    aug = [list(row) + [int(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next(r for r in range(col, n) if aug[r][col])
+        aug[col], aug[pivot] = aug[pivot], aug[col]
+        scale = _gf_inv(aug[col][col])
+        aug[col] = [_gf_mul(scale, v) for v in aug[col]]
+        for r in range(n):
+            factor = aug[r][col]
+            if r != col and factor:
+                aug[r] = [v ^ _gf_mul(factor, p) for v, p in zip(aug[r], aug[col])]
+    return [row[n:] for row in aug]
+
+class ErasureCoder:
+    """Systematic Reed-Solomon (k, m) code over GF(2^8)
+
+    A chunk is cut into k data shards plus m parity shards, and any k of
+    the k + m rebuild it. The parity rows form a Cauchy matrix, so every
+    k x k submatrix of the generator is invertible.
+    """
+    
+    def __init__(self, k: int, m: int):
+        if k < 1 or m < 0 or k + m > 256:
+            raise ValueError(f"Invalid erasure code ({k},{m})")
+        self.k = k
+        self.m = m
+        self.parity = [[_gf_inv((k + i) ^ j) for j in range(k)] for i in range(m)]
+        self._inverses: Dict[Tuple[int, ...], List[List[int]]] = {}
+
+    def encode(self, block: bytes) -> List[bytes]:
+        """Split block into k zero-padded data shards and append m parity shards"""
+        size = -(-len(block) // self.k)
+        data = bytes(block).ljust(size * self.k, b"\0")
+        shards = [data[j * size:(j + 1) * size] for j in range(self.k)]
+        return shards + [self._combine(row, shards) for row in self.parity]
+
+    def decode(self, shards: Dict[int, bytes], length: int) -> bytes:
+        """Rebuild the first length bytes of a block from any k shards, keyed by index"""
+        k = self.k
+        if len(shards) < k:
+            raise ValueError(f"Need {k} shards to decode, got {len(shards)}")
+        if all(j in shards for j in range(k)):
+            return b"".join(shards[j] for j in range(k))[:length]
+        rows = tuple(sorted(shards)[:k])
+        inverse = self._inverses.get(rows)
+        if inverse is None:
+            generator = [[int(i == j) for j in range(k)] if i < k else self.parity[i - k]
+                         for i in rows]
+            inverse = self._inverses[rows] = _gf_invert(generator)
+        present = [shards[i] for i in rows]
+        data = [shards[j] if j in shards else self._combine(inverse[j], present)
+                for j in range(k)]
+        return b"".join(data)[:length]
+
+    @staticmethod
+    def _combine(coeffs: List[int], shards: List[bytes]) -> bytes:
+        """GF(2^8) dot product of coefficients with equal-length shards"""
+        acc = 0
+        for c, shard in zip(coeffs, shards):
+            if c:
+                acc ^= int.from_bytes(shard.translate(_gf_mul_table(c)), "little")
+        return acc.to_bytes(len(shards[0]), "little")
+
+class Progress:
+    """Single-line chunk progress on an interactive stderr; silent otherwise"""
+    
+    def __init__(self, label: str, total: int):
+        self.label = label
+        self.total = total
+        self.enabled = total > 0 and sys.stderr.isatty()
+        self._next = 0
+    
+    def update(self, done: int):
+        """Redraw once per percent of progress rather than once per chunk"""
+        if not self.enabled or (done < self._next and done < self.total):
+            return
+        self._next = done + max(1, self.total // 100)
+        sys.stderr.write(f"\r[{self.label}] {done}/{self.total} chunks ({done * 100 // self.total}%)")
+        sys.stderr.flush()
+    
+    def close(self):
+        if self.enabled:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+
+class VerifiedCache:
+    """Bounded LRU set of (node, chunk file, mtime_ns) replicas that passed a full check
+
+    New entries are appended to a log so the set survives between runs;
+    the log is rewritten from the live set once it holds twice as many
+    lines as the cache can keep.
+    """
+    
+    def __init__(self, path: Path, capacity: int = VERIFIED_CACHE_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self._entries: Optional[OrderedDict] = None  # loaded on first use
+        self._log_lines = 0
+        self._unsaved: List[Tuple[str, str, int]] = []
+        self._lock = threading.Lock()
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            entries = OrderedDict()
+            if self.path.exists():
+                with open(self.path, "rb") as f:
+                    for line in f:
+                        self._log_lines += 1
+                        try:
+                            key = tuple(json_loads(line))
+                        except ValueError:
+                            continue  # torn tail from an interrupted append
+                        entries[key] = None
+                        entries.move_to_end(key)
+                        if len(entries) > self.capacity:
+                            entries.popitem(last=False)
+            self._entries = entries
+        return self._entries
+
+    def __contains__(self, key: Tuple[str, str, int]) -> bool:
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                return False
+            entries.move_to_end(key)
+            return True
+
+    def add(self, key: Tuple[str, str, int]):
+        with self._lock:
+            entries = self._load()
+            entries[key] = None
+            entries.move_to_end(key)
+            if len(entries) > self.capacity:
+                entries.popitem(last=False)
+            self._unsaved.append(key)
+
+    def flush(self):
+        """Persist entries added since the last flush"""
+        with self._lock:
+            if not self._unsaved:
+                return
+            if self._log_lines + len(self._unsaved) > 2 * self.capacity:
+                lines, mode = list(self._entries), "wb"
+                self._log_lines = 0
+            else:
+                lines, mode = self._unsaved, "ab"
+            with open(self.path, mode) as f:
+                f.write(b"".join(json_dumps(list(key), indent=False) + b"\n" for key in lines))
+            self._log_lines += len(lines)
+            self._unsaved = []
+
 class Node:
     """Represents a satellite storage node"""
     
@@ -46,21 +414,102 @@ class Node:
         self.name = f"sat_{node_id:02d}"
         self.path = base_dir / self.name
         ensure_dir(self.path)
+        self._prefix = os.path.join(self.path, "")  # str path + separator, for chunk paths
+        self._dir_fd: Optional[int] = None
+        self._chunk_count: Optional[int] = None  # cached; reset by every write
 
-    def put_chunk(self, chunk_filename: str, data: bytes):
-        """Store a chunk on this node"""
-        with open(self.path / chunk_filename, "wb") as f:
+    @contextmanager
+    def batch(self):
+        """Hold the node directory open so chunk files are opened relative to it"""
+        if self._dir_fd is not None or os.open not in os.supports_dir_fd:
+            yield self
+            return
+        self._dir_fd = os.open(self.path, os.O_RDONLY)
+        try:
+            yield self
+        finally:
+            os.close(self._dir_fd)
+            self._dir_fd = None
+
+    def _open(self, chunk_filename: str, mode: str, buffering: int = -1):
+        """Open a chunk file, relative to the directory fd inside batch()"""
+        if self._dir_fd is None:
+            return open(self._prefix + chunk_filename, mode, buffering)
+        return open(chunk_filename, mode, buffering, opener=self._opener)
+
+    def _opener(self, name: str, flags: int) -> int:
+        return os.open(name, flags, 0o666, dir_fd=self._dir_fd)
+
+    def put_chunk(self, chunk_filename: str, data: bytes) -> int:
+        """Store a chunk on this node, returning its mtime in nanoseconds"""
+        self._chunk_count = None
+        with self._open(chunk_filename, "wb") as f:
             f.write(data)
+            f.flush()
+            return os.fstat(f.fileno()).st_mtime_ns
+
+    def put_chunk_from_fd(self, chunk_filename: str, src_fd: int, length: int,
+                          offset: int = 0) -> int:
+        """Store length bytes of src_fd starting at offset, copied in-kernel
+
+        Tries copy_file_range, then sendfile; raises OSError if neither
+        can move the bytes. Returns the new chunk's mtime in nanoseconds.
+        """
+        self._chunk_count = None
+        with self._open(chunk_filename, "wb", 0) as fdst:
+            dst_fd = fdst.fileno()
+            done = 0
+            for splice in (_copy_range, _sendfile_range):
+                try:
+                    while done < length:
+                        copied = splice(src_fd, dst_fd, offset + done, length - done)
+                        if not copied:
+                            raise OSError("in-kernel copy made no progress")
+                        done += copied
+                    break
+                except (OSError, AttributeError):
+                    continue
+            else:
+                raise OSError(f"cannot copy {chunk_filename} in-kernel")
+            return os.fstat(dst_fd).st_mtime_ns
+
+    def copy_chunk_from(self, src: "Node", chunk_filename: str, data: bytes) -> int:
+        """Store a replica by copying src's copy of the chunk in-kernel
+
+        Small chunks, and copies the kernel refuses, fall back to a plain
+        write of data.
+        """
+        if len(data) < COPY_FILE_RANGE_MIN:
+            return self.put_chunk(chunk_filename, data)
+        with src._open(chunk_filename, "rb", 0) as fsrc:
+            try:
+                return self.put_chunk_from_fd(chunk_filename, fsrc.fileno(), len(data))
+            except OSError:
+                return self.put_chunk(chunk_filename, data)
 
     def has_chunk(self, chunk_filename: str) -> bool:
         """Check if chunk exists on this node"""
-        return (self.path / chunk_filename).exists()
+        return os.path.exists(self._prefix + chunk_filename)
 
     def get_chunk(self, chunk_filename: str) -> bytes:
         """Retrieve a chunk from this node"""
-        with open(self.path / chunk_filename, "rb") as f:
+        with open(self._prefix + chunk_filename, "rb") as f:
             return f.read()
 
+    def get_chunk_stamped(self, chunk_filename: str) -> Tuple[bytes, int]:
+        """Retrieve a chunk together with its mtime in nanoseconds"""
+        with open(self._prefix + chunk_filename, "rb") as f:
+            return f.read(), os.fstat(f.fileno()).st_mtime_ns
+
+    def chunk_count(self) -> int:
+        """Number of chunk files stored on this node"""
+        if self._chunk_count is None:
+            if not self.path.exists():
+                return 0
+            with os.scandir(self.path) as it:
+                self._chunk_count = sum(1 for e in it if ".chunk" in e.name)
+        return self._chunk_count
+
 class FSLite:
     """Main FS-Lite distributed file system"""
     
@@ -70,22 +519,89 @@ class FSLite:
         ensure_dir(NODES_DIR)
         self.num_nodes = max(1, int(num_nodes))
         self.nodes: List[Node] = [Node(i + 1, NODES_DIR) for i in range(self.num_nodes)]
+        self._nodes_by_name: Dict[str, Node] = {n.name: n for n in self.nodes}
         self.metadata_path = METADATA_FILE
+        self.wal_path = METADATA_WAL
         self.state_path = NODE_STATE_FILE
-        self.metadata = self._load_json(self.metadata_path) or {}
+        self._meta_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._verified = VerifiedCache(VERIFIED_LOG)
+        self._wal_live: Dict[str, int] = {}  # file -> size of its current WAL record
+        self._wal_live_bytes = 0
+        self.metadata = self._load_metadata()
         self.node_state = self._load_json(self.state_path) or {n.name: {"online": True} for n in self.nodes}
+        self._offline = {name for name, s in self.node_state.items() if not s.get("online", True)}
+        self._pool = ThreadPoolExecutor(max_workers=max(8, self.num_nodes))
+        self._rotations: Dict[int, List[Tuple[Node, ...]]] = {}  # replication -> placements
+        self._ring_keys: Optional[List[int]] = None
+        self._ring_nodes: List[Node] = []
+        self._ring_placements: Dict[int, List[Tuple[Node, ...]]] = {}
 
     def _load_json(self, path: Path) -> Optional[Dict]:
         """Load JSON file"""
         if path.exists():
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return json_loads(path.read_bytes())
         return None
 
     def _save_json(self, path: Path, data: Dict):
         """Save data to JSON file"""
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        path.write_bytes(json_dumps(data))
+
+    def _load_metadata(self) -> Dict:
+        """Load the metadata snapshot and replay the write-ahead log over it"""
+        metadata = self._load_json(self.metadata_path) or {}
+        if self.wal_path.exists():
+            with open(self.wal_path, "r+b") as f:
+                good_end = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated record")
+                        record = json_loads(line)
+                    except ValueError:
+                        # Torn tail from an interrupted append, even one that
+                        # happens to parse: drop it so later appends start on
+                        # a clean line
+                        f.truncate(good_end)
+                        break
+                    good_end += len(line)
+                    if record.get("op") == "put":
+                        metadata[record["name"]] = record["meta"]
+                        self._track_live(record["name"], len(line))
+        return metadata
+
+    def _track_live(self, fname: str, record_size: int):
+        """Note that fname's current metadata is a WAL record of record_size bytes"""
+        self._wal_live_bytes += record_size - self._wal_live.get(fname, 0)
+        self._wal_live[fname] = record_size
+
+    def _put_metadata(self, fname: str, file_meta: Dict):
+        """Record a file's metadata by appending one line to the WAL"""
+        record = json_dumps({"op": "put", "name": fname, "meta": file_meta}, indent=False) + b"\n"
+        with self._meta_lock:
+            self.metadata[fname] = file_meta
+            with open(self.wal_path, "ab") as f:
+                f.write(record)
+                wal_size = f.tell()
+            self._track_live(fname, len(record))
+            live_bytes = self._wal_live_bytes
+        
+        # Compact only once superseded records make up most of the log;
+        # a WAL of live records replays no slower than a snapshot would
+        if wal_size > max(WAL_COMPACT_RATIO * live_bytes, WAL_COMPACT_MIN):
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self.compact_metadata)
+                self._compactor.start()
+
+    def compact_metadata(self):
+        """Fold the WAL into a fresh metadata snapshot and truncate it"""
+        with self._meta_lock:
+            tmp_path = self.metadata_path.with_suffix(".tmp")
+            tmp_path.write_bytes(json_dumps(self.metadata))
+            os.replace(tmp_path, self.metadata_path)
+            open(self.wal_path, "wb").close()
+            self._wal_live.clear()
+            self._wal_live_bytes = 0
 
     def init_nodes(self, num_nodes: int):
         """Initialize satellite nodes"""
@@ -94,16 +610,43 @@ class FSLite:
             shutil.rmtree(NODES_DIR)
         ensure_dir(NODES_DIR)
         self.nodes = [Node(i + 1, NODES_DIR) for i in range(self.num_nodes)]
+        self._nodes_by_name = {n.name: n for n in self.nodes}
+        self._rotations = {}
+        self._ring_keys = None
+        self._ring_placements = {}
         self.node_state = {n.name: {"online": True} for n in self.nodes}
+        self._offline = set()
+        if VERIFIED_LOG.exists():
+            VERIFIED_LOG.unlink()
+        self._verified = VerifiedCache(VERIFIED_LOG)
         self._save_json(self.state_path, self.node_state)
         print(f"[SUCCESS] Initialized {self.num_nodes} satellite nodes")
 
     def upload_file(self, file_path: str, chunk_size: int = 1024, 
-                   strategy: str = "round_robin", replication: int = 2):
-        """Upload a file with sharding and replication"""
+                   strategy: str = "round_robin", replication: int = 2,
+                   durable: bool = False, erasure: Optional[Tuple[int, int]] = None,
+                   checksum: str = DEFAULT_CHECKSUM):
+        """Upload a file with sharding and replication
+
+        With durable=True every chunk and the metadata record are flushed
+        to stable storage by a single filesystem sync at the end.
+
+        With erasure=(k, m) each chunk is Reed-Solomon coded into k data
+        and m parity shards on k + m distinct nodes instead of being
+        replicated, surviving m lost shards at m/k storage overhead.
+
+        checksum names the CHECKSUMS algorithm used to verify chunks; it is
+        recorded in the metadata so downloads verify with the same one.
+        """
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
+        if checksum not in CHECKSUMS:
+            raise ValueError(f"Unsupported checksum {checksum!r} (available: {', '.join(CHECKSUMS)})")
+        coder = ErasureCoder(*erasure) if erasure else None
+        if coder and coder.k + coder.m > self.num_nodes:
+            raise ValueError(f"Erasure code ({coder.k},{coder.m}) needs "
+                             f"{coder.k + coder.m} nodes, only {self.num_nodes} available")
         
         fname = path.name
         filesize = path.stat().st_size
@@ -111,116 +654,317 @@ class FSLite:
         print(f"\n[UPLOAD] {fname} ({format_bytes(filesize)})")
         start_time = time.time()
         
-        # Read and split file into chunks
-        chunks = []
+        # Map the file read-only and slice zero-copy chunk views out of it
         with open(path, "rb") as f:
-            idx = 0
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                chunks.append((idx, data))
-                idx += 1
-        
-        print(f"[SHARDING] Split into {len(chunks)} chunks ({format_bytes(chunk_size)} each)")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if filesize else b""
+        view = memoryview(mm)
+        filesize = len(view)
+        total_chunks = -(-filesize // chunk_size)
+        print(f"[SHARDING] Split into {total_chunks} chunks ({format_bytes(chunk_size)} each)")
         
         # Create metadata
         file_meta = {
             "file_name": fname,
             "size": filesize,
             "chunk_size": chunk_size,
-            "total_chunks": len(chunks),
+            "total_chunks": total_chunks,
             "strategy": strategy,
-            "replication": replication,
+            "checksum": checksum,
             "chunks": {}
         }
+        if coder:
+            file_meta["erasure"] = [coder.k, coder.m]
+            prepare, store = partial(self._encode_window, coder, checksum), self._store_stripes
+            select = self._selector(strategy, coder.k + coder.m, fname)
+        else:
+            file_meta["replication"] = replication
+            prepare, store = partial(digest_batch, algo=checksum), self._store_window
+            select = self._selector(strategy, replication, fname)
         
-        # Distribute chunks
-        for chunk_idx, data in chunks:
-            chunk_name = f"{fname}.chunk{chunk_idx}"
-            chunk_hash = sha256_bytes(data)
-            
-            nodes_selected = self._select_nodes(chunk_idx, replication, strategy, fname)
-            replicas = []
-            
-            for node in nodes_selected:
-                node.put_chunk(chunk_name, data)
-                replicas.append({
-                    "node": node.name,
-                    "chunk_filename": chunk_name,
-                    "hash": chunk_hash
-                })
-            
-            file_meta["chunks"][str(chunk_idx)] = replicas
+        # Hash and flush one window of chunks at a time so the queued
+        # writes stay bounded; the next window is hashed in the background
+        # while the current one is being written
+        window_bytes = max(1, UPLOAD_WINDOW_SIZE // chunk_size) * chunk_size
+        windows = ([view[off:off + chunk_size]
+                    for off in range(start, min(start + window_bytes, filesize), chunk_size)]
+                   for start in range(0, filesize, window_bytes))
+        progress = Progress("UPLOAD", total_chunks)
+        first_idx = 0
+        window = upcoming = None
+        try:
+            with gc_paused():
+                window = next(windows, None)
+                hashing = self._pool.submit(prepare, window) if window else None
+                while window:
+                    hashes = hashing.result()
+                    upcoming = next(windows, None)
+                    if upcoming:
+                        hashing = self._pool.submit(prepare, upcoming)
+                    store(file_meta, first_idx, window, hashes, select)
+                    first_idx += len(window)
+                    progress.update(first_idx)
+                    window = upcoming
+        finally:
+            # Unmap even when a write fails; views still pinned by the
+            # traceback keep the mapping alive until it is collected
+            progress.close()
+            window = upcoming = windows = None
+            try:
+                view.release()
+                if filesize:
+                    mm.close()
+            except BufferError:
+                pass
         
         # Save metadata
-        self.metadata[fname] = file_meta
-        self._save_json(self.metadata_path, self.metadata)
+        self._put_metadata(fname, file_meta)
+        if durable:
+            sync_filesystem(self.base)
         
         elapsed = time.time() - start_time
         throughput = filesize / elapsed / (1024 * 1024) if elapsed > 0 else 0
         print(f"[SUCCESS] Upload complete!")
         print(f"[METRICS] Time: {elapsed:.2f}s | Throughput: {throughput:.2f} MB/s")
-        print(f"[CONFIG] Strategy: {strategy} | Replication: {replication}x")
+        if coder:
+            print(f"[CONFIG] Strategy: {strategy} | Erasure: RS({coder.k},{coder.m})")
+        else:
+            print(f"[CONFIG] Strategy: {strategy} | Replication: {replication}x")
+
+    def _store_window(self, file_meta: Dict, first_idx: int, window: List[memoryview],
+                      digests: Tuple[List[str], List[int]], select: Callable[[int], Sequence[Node]]):
+        """Place a window of consecutive, already hashed chunks and write their replicas"""
+        prefix = f"{file_meta['file_name']}.chunk"
+        chunks_meta = file_meta["chunks"]
+        hashes, crcs = digests
+        primaries: Dict[Node, List[Tuple]] = {}
+        copies: Dict[Node, List[Tuple]] = {}
+        
+        # Runs once per chunk, so everything it touches is bound to a local;
+        # writes are grouped by node here rather than in a second pass
+        for chunk_idx, data, chunk_hash, chunk_crc in zip(
+                range(first_idx, first_idx + len(window)), window, hashes, crcs):
+            key = str(chunk_idx)
+            chunk_name = prefix + key
+            nodes_selected = select(chunk_idx)
+            replicas = [{"node": node.name, "chunk_filename": chunk_name,
+                         "hash": chunk_hash, "crc32": chunk_crc}
+                        for node in nodes_selected]
+            chunks_meta[key] = replicas
+            primary = nodes_selected[0]
+            primaries.setdefault(primary, []).append((chunk_name, data, replicas[0]))
+            for node, record in zip(nodes_selected[1:], replicas[1:]):
+                copies.setdefault(node, []).append((primary, chunk_name, data, record))
+        
+        self._flush_writes(primaries, copies)
+
+    @staticmethod
+    def _encode_window(coder: ErasureCoder, algo: str,
+                       window: List[memoryview]) -> List[Tuple[List[bytes], Tuple[List[str], List[int]]]]:
+        """Erasure-code each chunk of a window and digest every shard"""
+        stripes = []
+        for data in window:
+            shards = coder.encode(data)
+            stripes.append((shards, digest_batch(shards, algo)))
+        return stripes
+
+    def _store_stripes(self, file_meta: Dict, first_idx: int, window: List[memoryview],
+                       stripes: List[Tuple[List[bytes], Tuple[List[str], List[int]]]],
+                       select: Callable[[int], Sequence[Node]]):
+        """Place each chunk's k + m erasure shards on distinct nodes and write them"""
+        fname = file_meta["file_name"]
+        writes: Dict[Node, List[Tuple]] = {}
+        
+        for chunk_idx, (shards, (hashes, crcs)) in enumerate(stripes, first_idx):
+            nodes_selected = select(chunk_idx)
+            records = []
+            for shard_idx, (node, data, shard_hash, shard_crc) in enumerate(
+                    zip(nodes_selected, shards, hashes, crcs)):
+                record = {
+                    "node": node.name,
+                    "chunk_filename": f"{fname}.chunk{chunk_idx}.s{shard_idx}",
+                    "hash": shard_hash,
+                    "crc32": shard_crc,
+                    "shard": shard_idx
+                }
+                records.append(record)
+                writes.setdefault(node, []).append((record["chunk_filename"], data, record))
+            file_meta["chunks"][str(chunk_idx)] = records
+        
+        self._flush_writes(writes, {})
+
+    def _flush_writes(self, primaries: Dict[Node, List[Tuple[str, memoryview, Dict]]],
+                      copies: Dict[Node, List[Tuple[Node, str, memoryview, Dict]]]):
+        """Write queued chunks: the first replica from memory, the rest copied from it
+
+        Writes arrive grouped by node and run as one task per node over the
+        pool, first all primaries and then all copies, so a window costs
+        two waves of per-node tasks rather than one future per chunk.
+        """
+        with ExitStack() as stack:
+            for node in primaries.keys() | copies.keys():
+                stack.enter_context(node.batch())
+            list(self._pool.map(self._write_primaries, primaries.items()))
+            list(self._pool.map(self._write_copies, copies.items()))
+
+    @staticmethod
+    def _write_primaries(job: Tuple[Node, List[Tuple[str, memoryview, Dict]]]):
+        """Write one node's first replicas from memory
+
+        Each replica record gets the mtime of the file just written, which
+        lets trusted downloads skip re-hashing untouched chunks.
+        """
+        node, writes = job
+        for chunk_name, data, record in writes:
+            record["mtime_ns"] = node.put_chunk(chunk_name, data)
+
+    @staticmethod
+    def _write_copies(job: Tuple[Node, List[Tuple[Node, str, memoryview, Dict]]]):
+        """Clone chunks onto one node from the nodes holding their primaries"""
+        node, writes = job
+        for primary, chunk_name, data, record in writes:
+            record["mtime_ns"] = node.copy_chunk_from(primary, chunk_name, data)
 
     def _select_nodes(self, chunk_id: int, replication: int, 
-                     strategy: str, filename: str) -> List[Node]:
+                     strategy: str, filename: str) -> Sequence[Node]:
         """Select nodes for chunk placement based on strategy"""
-        if replication > self.num_nodes:
-            replication = self.num_nodes
+        return self._selector(strategy, replication, filename)(chunk_id)
+
+    def _selector(self, strategy: str, replication: int,
+                  filename: str) -> Callable[[int], Sequence[Node]]:
+        """Placement function for one file, specialized once per upload
+
+        The strategy dispatch, replication clamp and table lookups happen
+        here; the returned closure only does the per-chunk arithmetic.
+        """
+        replication = min(replication, self.num_nodes)
+        n = self.num_nodes
+        nodes = self.nodes
         
         if strategy == "round_robin":
-            start = chunk_id % self.num_nodes
-            return [self.nodes[(start + i) % self.num_nodes] for i in range(replication)]
-        elif strategy == "random":
-            return random.sample(self.nodes, replication)
-        elif strategy == "hash":
-            key = f"{filename}:{chunk_id}".encode()
-            digest = int(hashlib.sha256(key).hexdigest(), 16)
-            return [self.nodes[(digest + i) % self.num_nodes] for i in range(replication)]
-        else:
-            return [self.nodes[chunk_id % self.num_nodes]]
+            table = self._rotation(replication)
+            return lambda chunk_id: table[chunk_id % n]
+        if strategy == "random":
+            sample = random.sample
+            return lambda chunk_id: sample(nodes, replication)
+        if strategy == "hash":
+            keys, placements = self._ring(replication)
+            base, size, find = _hash_base(filename), len(placements), bisect.bisect
+            def select(chunk_id: int) -> Sequence[Node]:
+                h = base.copy()
+                h.update(str(chunk_id).encode())
+                return placements[find(keys, int.from_bytes(h.digest(), "big")) % size]
+            return select
+        return lambda chunk_id: (nodes[chunk_id % n],)
+
+    def _ring(self, replication: int) -> Tuple[List[int], List[Tuple[Node, ...]]]:
+        """Consistent-hash ring points and the replica set starting at each
+
+        Each node owns RING_VNODES points, so adding or removing a node
+        only moves the chunks in the arcs next to its points. A chunk's
+        key is placed with one bisect over the points.
+        """
+        if self._ring_keys is None:
+            ring = sorted(
+                (int.from_bytes(hashlib.blake2b(f"{n.name}#{v}".encode(), digest_size=8).digest(), "big"), n.id, n)
+                for n in self.nodes for v in range(RING_VNODES))
+            self._ring_keys = [point for point, _, _ in ring]
+            self._ring_nodes = [n for _, _, n in ring]
+        placements = self._ring_placements.get(replication)
+        if placements is None:
+            ring_nodes, size = self._ring_nodes, len(self._ring_nodes)
+            placements = []
+            for start in range(size):
+                chosen: List[Node] = []
+                step = start
+                while len(chosen) < replication:
+                    node = ring_nodes[step % size]
+                    if node not in chosen:
+                        chosen.append(node)
+                    step += 1
+                placements.append(tuple(chosen))
+            self._ring_placements[replication] = placements
+        return self._ring_keys, placements
+
+    def _rotation(self, replication: int) -> List[Tuple[Node, ...]]:
+        """Placement table: entry s holds the replication nodes starting at node s"""
+        table = self._rotations.get(replication)
+        if table is None:
+            n = self.num_nodes
+            table = [tuple(self.nodes[(s + i) % n] for i in range(replication)) for s in range(n)]
+            self._rotations[replication] = table
+        return table
 
-    def download_file(self, file_name: str, out_path: str):
-        """Download and reconstruct a file"""
+    def download_file(self, file_name: str, out_path: str, trust_local: bool = False):
+        """Download and reconstruct a file
+
+        With trust_local=True a replica whose mtime still matches the one
+        recorded at upload is accepted without re-hashing it, and any other
+        replica is checked against its CRC-32 instead of the full checksum.
+        """
         if file_name not in self.metadata:
             raise FileNotFoundError(f"File not found in metadata: {file_name}")
         
         meta = self.metadata[file_name]
+        algo = meta.get("checksum", "sha256")
+        if algo not in CHECKSUMS:
+            raise RuntimeError(f"{file_name} was uploaded with {algo} checksums, "
+                               f"which this installation cannot verify")
         out_path = Path(out_path)
         ensure_dir(out_path.parent)
         
         print(f"\n[DOWNLOAD] {file_name}")
         start_time = time.time()
         
-        with open(out_path, "wb") as out_f:
-            for i in range(meta["total_chunks"]):
-                replicas = meta["chunks"][str(i)]
-                chunk_data = None
-                
-                for r in replicas:
-                    node_name = r["node"]
-                    if not self.node_state.get(node_name, {}).get("online", True):
-                        continue
-                    
-                    node = self._node_by_name(node_name)
-                    if not node or not node.has_chunk(r["chunk_filename"]):
-                        continue
+        # Pool workers fetch, verify and pwrite chunks straight to their
+        # offsets in the preallocated output, PREFETCH_CHUNKS at a time, so
+        # one slow replica does not hold up the chunks behind it
+        total = meta["total_chunks"]
+        chunk_size, size = meta["chunk_size"], meta["size"]
+        if "erasure" in meta:
+            coder = ErasureCoder(*meta["erasure"])
+            fetch = lambda i: self._fetch_stripe(coder, meta["chunks"][str(i)],
+                                                 min(chunk_size, size - i * chunk_size),
+                                                 trust_local, algo)
+            backup_label = "rebuilt from parity"
+        else:
+            fetch = lambda i: self._fetch_chunk(meta["chunks"][str(i)], trust_local, algo)
+            backup_label = "served by backup replicas"
+        progress = Progress("DOWNLOAD", total)
+        from_backup = 0
+        
+        fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+        in_flight = {}
+        try:
+            os.ftruncate(fd, size)
+            next_idx = done = 0
+            while done < total:
+                while next_idx < total and len(in_flight) < PREFETCH_CHUNKS:
+                    future = self._pool.submit(self._restore_chunk, fd, fetch, next_idx, chunk_size)
+                    in_flight[future] = next_idx
+                    next_idx += 1
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = in_flight.pop(future)
+                    restored, node_name, corrupt = future.result()
                     
-                    data = node.get_chunk(r["chunk_filename"])
-                    if sha256_bytes(data) != r["hash"]:
-                        print(f"[WARNING] Integrity check failed for chunk {i} on {node_name}")
-                        continue
+                    for bad in corrupt:
+                        print(f"[WARNING] Integrity check failed for chunk {i} on {bad}")
+                    if not restored:
+                        raise RuntimeError(f"Cannot recover chunk {i} - all replicas failed")
                     
-                    chunk_data = data
-                    print(f"[OK] Chunk {i} from {node_name}")
-                    break
-                
-                if chunk_data is None:
-                    raise RuntimeError(f"Cannot recover chunk {i} - all replicas failed")
-                
-                out_f.write(chunk_data)
+                    if node_name != meta["chunks"][str(i)][0]["node"]:
+                        from_backup += 1
+                    done += 1
+                progress.update(done)
+        finally:
+            for future in in_flight:
+                future.cancel()
+            wait(in_flight)
+            os.close(fd)
+        progress.close()
         
+        self._verified.flush()
+        print(f"[OK] {total} chunks verified ({from_backup} {backup_label})")
         elapsed = time.time() - start_time
         filesize = out_path.stat().st_size
         throughput = filesize / elapsed / (1024 * 1024) if elapsed > 0 else 0
@@ -228,18 +972,99 @@ class FSLite:
         print(f"[SUCCESS] Download complete: {out_path}")
         print(f"[METRICS] Time: {elapsed:.2f}s | Throughput: {throughput:.2f} MB/s")
 
+    @staticmethod
+    def _restore_chunk(fd: int, fetch, i: int, chunk_size: int) -> Tuple[bool, Optional[str], List[str]]:
+        """Fetch chunk i and write it at its offset; report success, source node and corrupt nodes"""
+        data, node_name, corrupt = fetch(i)
+        if data is None:
+            return False, None, corrupt
+        pwrite_all(fd, data, i * chunk_size)
+        return True, node_name, corrupt
+
+    def _read_replica(self, replica: Dict) -> Tuple[Optional[bytes], int]:
+        """Read one replica and its mtime, or None if the node is offline or lacks it"""
+        node_name = replica["node"]
+        if node_name in self._offline:
+            return None, 0
+        
+        node = self._node_by_name(node_name)
+        if not node:
+            return None, 0
+        
+        try:
+            return node.get_chunk_stamped(replica["chunk_filename"])
+        except FileNotFoundError:
+            return None, 0
+
+    def _verify(self, data: bytes, mtime_ns: int, record: Dict, trust_local: bool, algo: str) -> bool:
+        """Check a replica read back from disk against its metadata record
+
+        A replica rewritten since upload that passes the full checksum is
+        remembered by its current mtime, so trusted downloads can accept
+        it again without re-hashing until it changes.
+        """
+        stamped = record.get("mtime_ns") == mtime_ns
+        key = (record["node"], record["chunk_filename"], mtime_ns)
+        if trust_local:
+            if stamped or key in self._verified:
+                return True
+            if "crc32" in record:
+                return zlib.crc32(data) == record["crc32"]
+        if checksum_bytes(data, algo) != record["hash"]:
+            return False
+        if not stamped:
+            self._verified.add(key)
+        return True
+
+    def _fetch_chunk(self, replicas: List[Dict], trust_local: bool = False,
+                     algo: str = "sha256") -> Tuple[Optional[bytes], Optional[str], List[str]]:
+        """Return the first replica that verifies, its node and any corrupt nodes"""
+        corrupt = []
+        for r in replicas:
+            data, mtime_ns = self._read_replica(r)
+            if data is None:
+                continue
+            if not self._verify(data, mtime_ns, r, trust_local, algo):
+                corrupt.append(r["node"])
+                continue
+            return data, r["node"], corrupt
+        return None, None, corrupt
+
+    def _fetch_stripe(self, coder: ErasureCoder, records: List[Dict], length: int,
+                      trust_local: bool = False,
+                      algo: str = "sha256") -> Tuple[Optional[bytes], Optional[str], List[str]]:
+        """Decode a chunk from its first k verified shards
+
+        The node name is that of the first data shard, or None when parity
+        had to stand in for a missing data shard.
+        """
+        shards: Dict[int, bytes] = {}
+        corrupt = []
+        for r in records:
+            if len(shards) == coder.k:
+                break
+            data, mtime_ns = self._read_replica(r)
+            if data is None:
+                continue
+            if not self._verify(data, mtime_ns, r, trust_local, algo):
+                corrupt.append(r["node"])
+                continue
+            shards[r["shard"]] = data
+        if len(shards) < coder.k:
+            return None, None, corrupt
+        rebuilt = any(j not in shards for j in range(coder.k))
+        return coder.decode(shards, length), None if rebuilt else records[0]["node"], corrupt
+
     def _node_by_name(self, node_name: str):
         """Get node object by name"""
-        for n in self.nodes:
-            if n.name == node_name:
-                return n
-        return None
+        return self._nodes_by_name.get(node_name)
 
     def node_offline(self, node_name: str):
         """Mark a node as offline (simulate failure)"""
         if node_name not in self.node_state:
             raise KeyError(f"Node not found: {node_name}")
         self.node_state[node_name]["online"] = False
+        self._offline.add(node_name)
         self._save_json(self.state_path, self.node_state)
         print(f"[FAILURE] {node_name} marked OFFLINE")
 
@@ -248,6 +1073,7 @@ class FSLite:
         if node_name not in self.node_state:
             raise KeyError(f"Node not found: {node_name}")
         self.node_state[node_name]["online"] = True
+        self._offline.discard(node_name)
         self._save_json(self.state_path, self.node_state)
         print(f"[RECOVERY] {node_name} marked ONLINE")
 
@@ -257,7 +1083,7 @@ class FSLite:
         print("SYSTEM STATUS")
         print("="*60)
         
-        online = sum(1 for s in self.node_state.values() if s.get("online", True))
+        online = len(self.node_state) - len(self._offline)
         total = len(self.nodes)
         
         print(f"[STATUS] Nodes: {online}/{total} online")
@@ -265,9 +1091,8 @@ class FSLite:
         print(f"\nNode Details:")
         
         for n in self.nodes:
-            state = self.node_state.get(n.name, {})
-            status = "ONLINE" if state.get("online", True) else "OFFLINE"
-            chunks = len(list(n.path.glob("*.chunk*"))) if n.path.exists() else 0
+            status = "OFFLINE" if n.name in self._offline else "ONLINE"
+            chunks = n.chunk_count()
             print(f"  {n.name}: {status} | {chunks} chunks")
 
     def list_files(self):
@@ -284,7 +1109,10 @@ class FSLite:
             print(f"   Size: {format_bytes(meta['size'])}")
             print(f"   Chunks: {meta['total_chunks']}")
             print(f"   Strategy: {meta.get('strategy', 'N/A')}")
-            print(f"   Replication: {meta.get('replication', 1)}x")
+            if "erasure" in meta:
+                print(f"   Erasure: RS({meta['erasure'][0]},{meta['erasure'][1]})")
+            else:
+                print(f"   Replication: {meta.get('replication', 1)}x")
 
     def run_demo(self):
         """Run automated demonstration"""
@@ -316,11 +1144,10 @@ class FSLite:
         self.download_file("demo_test.txt", "recovered_demo.txt")
         
         print("\n[STEP 7] Verifying integrity...")
-        with open(test_file, "rb") as f1, open("recovered_demo.txt", "rb") as f2:
-            if f1.read() == f2.read():
-                print("[SUCCESS] FILE INTEGRITY VERIFIED!")
-            else:
-                print("[ERROR] Integrity check failed")
+        if sha256_file(test_file) == sha256_file("recovered_demo.txt"):
+            print("[SUCCESS] FILE INTEGRITY VERIFIED!")
+        else:
+            print("[ERROR] Integrity check failed")
         
         print("\n" + "="*60)
         print("DEMO SUMMARY")
@@ -329,7 +1156,7 @@ class FSLite:
         print("[OK] Uploaded file with 2x replication")
         print("[OK] Simulated satellite node failure")
         print("[OK] Successfully recovered file from replicas")
-        print("[OK] SHA-256 integrity verification passed")
+        print(f"[OK] Chunk integrity verification ({DEFAULT_CHECKSUM}) passed")
         print("="*60)
         print("\nThank you! Demonstration complete.")
 
@@ -355,11 +1182,21 @@ def build_parser():
     sp_upload.add_argument("--strategy", "-t", choices=["round_robin", "random", "hash"], 
                           default="round_robin", help="Distribution strategy")
     sp_upload.add_argument("--replication", "-r", type=int, default=2, help="Replication factor")
+    sp_upload.add_argument("--durable", action="store_true",
+                          help="Sync chunks and metadata to disk before returning")
+    sp_upload.add_argument("--erasure", "-e", type=parse_erasure, metavar="K,M",
+                          help="Reed-Solomon code chunks into K data + M parity shards "
+                               "instead of replicating them")
+    sp_upload.add_argument("--checksum", choices=sorted(CHECKSUMS), default=DEFAULT_CHECKSUM,
+                          help="Chunk checksum algorithm recorded for download verification")
     
     # download command
     sp_download = sub.add_parser("download", help="Download a file")
     sp_download.add_argument("file_name", help="File name to download")
     sp_download.add_argument("--out", "-o", required=True, help="Output file path")
+    sp_download.add_argument("--trust-local", action="store_true",
+                            help="Skip re-hashing replicas unchanged since upload and "
+                                 "check the rest by CRC-32")
     
     # list command
     sub.add_parser("list", help="List all uploaded files")
@@ -386,9 +1223,8 @@ def main():
     nodes_count = 8
     if NODE_STATE_FILE.exists():
         try:
-            with open(NODE_STATE_FILE) as f:
-                st = json.load(f)
-                nodes_count = len(st.keys()) or 8
+            st = json_loads(NODE_STATE_FILE.read_bytes())
+            nodes_count = len(st.keys()) or 8
         except:
             pass
     
@@ -402,9 +1238,10 @@ def main():
         elif args.command == "init-nodes":
             fs.init_nodes(args.count)
         elif args.command == "upload":
-            fs.upload_file(args.file, args.chunk_size, args.strategy, args.replication)
+            fs.upload_file(args.file, args.chunk_size, args.strategy, args.replication,
+                           durable=args.durable, erasure=args.erasure, checksum=args.checksum)
         elif args.command == "download":
-            fs.download_file(args.file_name, args.out)
+            fs.download_file(args.file_name, args.out, trust_local=args.trust_local)
         elif args.command == "list":
             fs.list_files()
         elif args.command == "status":
@@ -1,18 +1,81 @@
 """OSS Client - User interface"""
+import hmac
+import os
 import time
 import requests
 import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from sharding.engine import ShardingEngine
+from typing import Dict, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from sharding.engine import ShardBufferPool, ShardingEngine, integrity_seal, tag_checksum
+from utils import wire
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+MAX_PARALLEL_SHARDS = 32  # shard transfers in flight at once, and pooled connections
+
 
 class OSSClient:
-    def __init__(self, master_url='http://localhost:5000'):
+    def __init__(self, master_url='http://localhost:5000', max_workers=MAX_PARALLEL_SHARDS,
+                 verify_mode='full', seal_key=None):
+        if verify_mode not in ('full', 'seal'):
+            raise ValueError(f"Unknown verify_mode: {verify_mode}")
         self.master_url = master_url
         self.engine = ShardingEngine()
+        self.max_workers = max_workers
+        # 'seal' accepts a shard whose satellite seal matches the master's
+        # checksum without rehashing it; 'full' always rehashes
+        if seal_key is None and os.environ.get('OSS_SEAL_KEY'):
+            seal_key = os.environ['OSS_SEAL_KEY'].encode()
+        self.verify_mode = verify_mode if seal_key is not None else 'full'
+        self.seal_key = seal_key
+        # One keep-alive pool shared by all transfer threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        # Transfer threads are started on first use and kept across calls
+        self._executor = None
+        # node_id -> base URL, filled from the master's replies
+        self._url_cache: Dict[str, str] = {}
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.session.close()
+    
+    def _post(self, path, obj):
+        """POST obj to the master in the preferred control-plane encoding"""
+        return self.session.post(f"{self.master_url}{path}", data=wire.pack(obj),
+                                 headers={'Content-Type': wire.CONTENT_TYPE,
+                                          'Accept': wire.CONTENT_TYPE})
+    
+    @staticmethod
+    def _unpack(resp):
+        return wire.unpack(resp.content, resp.headers.get('Content-Type', ''))
+    
+    def _parallel(self, fn, items):
+        """Run fn over items on up to max_workers threads, returning results in order
+        
+        items may be a lazy iterator: each item is submitted as soon as it
+        is produced, so producing the next one overlaps the transfers.
+        """
+        if isinstance(items, list) and len(items) <= 1:
+            return [fn(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='oss-transfer')
+        futures = []
+        try:
+            for item in items:
+                futures.append(self._executor.submit(fn, item))
+        finally:
+            # Let every transfer settle before raising, so none outlives the
+            # buffers or file descriptors the caller cleans up afterwards
+            wait(futures)
+        return [f.result() for f in futures]
     
     def upload(self, file_path: str) -> str:
         start = time.time()
@@ -24,30 +87,37 @@ class OSSClient:
         size = path.stat().st_size
         logger.info(f"📤 Uploading {path.name} ({size/(1024*1024):.2f} MB)")
         
-        shards = self.engine.shard_file(file_path)
+        num_shards = self.engine.num_shards(size)
         
-        resp = requests.post(f"{self.master_url}/assign_shards", 
-                           json={'file_id': file_id, 'num_shards': len(shards), 
-                                'file_size': size})
+        resp = self._post('/assign_shards', {'file_id': file_id, 'num_shards': num_shards, 
+                                             'file_size': size})
         if resp.status_code != 200:
             raise Exception(f"Assignment failed: {resp.text}")
         
-        assignments = resp.json()['assignments']
-        strategy = resp.json()['strategy']
+        plan = self._unpack(resp)
+        self._url_cache.update(plan.get('nodes', {}))
+        assignments = plan['assignments']
+        strategy = plan['strategy']
         logger.info(f"📋 Strategy: {strategy}")
         
-        for sid, data, checksum in shards:
+        def send(shard):
+            sid, data, checksum = shard
             nid = assignments[str(sid)]
-            nurl = self._node_url(nid)
-            self._upload_shard(nurl, file_id, sid, data, checksum)
-            requests.post(f"{self.master_url}/register_shard", 
-                        json={'file_id': file_id, 'shard_id': sid, 
-                             'node_id': nid, 'checksum': checksum, 'size': len(data)})
+            self._upload_shard(self._node_url(nid), file_id, sid, data, checksum)
+            return {'shard_id': sid, 'node_id': nid, 'size': len(data),
+                    'checksum': tag_checksum(self.engine.checksum, checksum)}
         
-        requests.post(f"{self.master_url}/register_file",
-                    json={'file_id': file_id, 'original_name': path.name,
-                         'total_size': size, 'num_shards': len(shards), 
-                         'strategy': strategy})
+        # Upload each shard straight out of the file mapping as soon as it is
+        # hashed, then commit the shards and the file record in one request
+        with self.engine.mapped_shards(file_path) as shards:
+            placed = self._parallel(send, shards)
+        resp = self._post('/register_shards', {'file_id': file_id, 'shards': placed,
+                                               'file': {'original_name': path.name,
+                                                        'total_size': size,
+                                                        'num_shards': num_shards,
+                                                        'strategy': strategy}})
+        if resp.status_code != 200:
+            raise Exception(f"Registration failed: {resp.text}")
         
         elapsed = time.time() - start
         throughput = size / elapsed / (1024*1024)
@@ -59,50 +129,95 @@ class OSSClient:
         start = time.time()
         logger.info(f"📥 Downloading {file_id}")
         
-        resp = requests.post(f"{self.master_url}/get_shard_locations",
-                           json={'file_id': file_id})
+        resp = self._post('/get_shard_locations', {'file_id': file_id})
         if resp.status_code != 200:
             raise Exception(f"Not found: {file_id}")
         
-        locations = resp.json()['locations']
-        shards = []
+        found = self._unpack(resp)
+        self._url_cache.update(found.get('nodes', {}))
+        locations = found['locations']
+        size = found.get('total_size')
+        if size is None:
+            size = sum(loc['size'] for loc in locations)
+        
+        # Each shard is read into a pooled buffer, verified and written at its
+        # own offset as soon as it arrives; one buffer per transfer thread
+        fd = self.engine.open_output(output, size)
+        pool = ShardBufferPool(self.engine.shard_size, min(self.max_workers, len(locations)))
         
-        for loc in locations:
+        def fetch(loc):
             sid = loc['shard_id']
-            nid = loc['node_id']
-            checksum = loc['checksum']
-            nurl = self._node_url(nid)
-            data = self._download_shard(nurl, file_id, sid)
-            
-            if not self.engine.verify_shard(data, checksum):
-                raise Exception(f"Checksum fail: shard {sid}")
-            
-            shards.append((sid, data))
+            buf = pool.acquire()
+            try:
+                data, seal = self._download_shard(self._node_url(loc['node_id']), file_id, sid, buf)
+                if not self._intact(file_id, loc, data, seal):
+                    raise Exception(f"Checksum fail: shard {sid}")
+                self.engine.write_shard_at(fd, sid, data)
+            finally:
+                pool.release(buf)
         
-        self.engine.reconstruct_file(shards, output)
+        try:
+            self._parallel(fetch, locations)
+        finally:
+            os.close(fd)
         
         elapsed = time.time() - start
-        size = Path(output).stat().st_size
         throughput = size / elapsed / (1024*1024)
         logger.info(f"✅ Downloaded: {output}")
         logger.info(f"📊 {elapsed:.2f}s | {throughput:.2f} MB/s")
     
     def _node_url(self, node_id: str) -> str:
-        num = int(node_id.split('_')[1])
-        return f"http://localhost:{5001 + num}"
+        url = self._url_cache.get(node_id)
+        if url is None:
+            # Masters that do not send URLs: derive it from the port layout
+            num = int(node_id.split('_')[1])
+            url = self._url_cache[node_id] = f"http://localhost:{5001 + num}"
+        return url
     
     def _upload_shard(self, url, fid, sid, data, checksum):
-        resp = requests.post(f"{url}/store", 
-                           files={'shard': ('shard.dat', data)},
-                           data={'file_id': fid, 'shard_id': sid, 'checksum': checksum})
+        resp = self.session.post(f"{url}/store", data=data,
+                                headers={'Content-Type': 'application/octet-stream',
+                                         'X-File-Id': fid, 'X-Shard-Id': str(sid),
+                                         'X-Checksum': checksum,
+                                         'X-Checksum-Algo': self.engine.checksum})
         if resp.status_code != 200:
             raise Exception(f"Upload fail: {resp.text}")
     
-    def _download_shard(self, url, fid, sid) -> bytes:
-        resp = requests.get(f"{url}/retrieve/{fid}/{sid}")
-        if resp.status_code != 200:
-            raise Exception(f"Download fail: {resp.text}")
-        return resp.content
+    def _intact(self, fid, loc, data, seal) -> bool:
+        """Check a downloaded shard against its location record
+        
+        A seal is only trusted for a body of the recorded size; anything
+        else is rehashed in full.
+        """
+        if len(data) == loc['size'] and self._sealed(fid, loc['shard_id'], loc['checksum'],
+                                                     loc['size'], seal):
+            return True
+        return self.engine.verify_shard(data, loc['checksum'])
+    
+    def _sealed(self, fid, sid, checksum, size, seal) -> bool:
+        """True if seal proves the satellite stored data matching checksum and size"""
+        if self.verify_mode != 'seal' or not seal:
+            return False
+        return hmac.compare_digest(seal, integrity_seal(self.seal_key, fid, sid, checksum, size))
+    
+    def _download_shard(self, url, fid, sid, buf: bytearray) -> Tuple[memoryview, Optional[str]]:
+        """Read a shard's body into buf; return a view of it and the shard's seal"""
+        with self.session.get(f"{url}/retrieve/{fid}/{sid}", stream=True) as resp:
+            if resp.status_code != 200:
+                raise Exception(f"Download fail: {resp.text}")
+            view = memoryview(buf)
+            n = 0
+            while n < len(view):
+                got = resp.raw.readinto(view[n:])
+                if not got:
+                    break
+                n += got
+            if n == len(view) and resp.raw.read(1):
+                raise Exception(f"Download fail: shard {sid} exceeds {len(view)} bytes")
+            seal = resp.headers.get('X-Integrity-Seal')
+        return view[:n], seal
     
     def get_system_status(self) -> dict:
-        return requests.get(f"{self.master_url}/status").json()
+        resp = self.session.get(f"{self.master_url}/status",
+                                headers={'Accept': wire.CONTENT_TYPE})
+        return self._unpack(resp)
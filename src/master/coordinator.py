@@ -1,17 +1,30 @@
 """Master Node - Central coordinator"""
 import time
 import threading
-from flask import Flask, request, jsonify
-from typing import Dict
+from flask import Flask, Response, request, jsonify
+from typing import Dict, Set
 
 from master.shard_map import ShardMap
 from master.heartbeat import HeartbeatMonitor
 from distribution.strategies import RoundRobinStrategy, ErasureCodingStrategy
+from utils import wire
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
+def _payload():
+    """Decode the request body, msgpack or JSON by its Content-Type"""
+    return wire.unpack(request.get_data(), request.mimetype)
+
+
+def _reply(obj, status=200):
+    """Encode obj as msgpack for clients that ask for it, JSON otherwise"""
+    if request.accept_mimetypes.best == wire.MSGPACK and wire.msgpack is not None:
+        return Response(wire.pack(obj), status=status, mimetype=wire.MSGPACK)
+    return jsonify(obj), status
+
+
 class MasterNode:
     def __init__(self, port=5000, db_path='metadata/master.db'):
         self.port = port
@@ -19,6 +32,10 @@ class MasterNode:
         self.shard_map = ShardMap(db_path)
         self.heartbeat = HeartbeatMonitor(interval=10, timeout=30)
         self.nodes: Dict[str, str] = {}
+        # Liveness as last seen by heartbeats and the failure monitor, kept
+        # incrementally so request handlers never rescan every node
+        self._healthy: Set[str] = set()
+        self._failed: Set[str] = set()
         self.lock = threading.Lock()
         
         self.round_robin = RoundRobinStrategy()
@@ -28,62 +45,94 @@ class MasterNode:
         self.server_thread = None
     
     def _setup_routes(self):
+        @self.app.errorhandler(wire.UnsupportedFormat)
+        def unsupported_format(e):
+            return jsonify({'error': str(e)}), 415
+        
         @self.app.route('/assign_shards', methods=['POST'])
         def assign_shards():
-            data = request.json
+            data = _payload()
             file_size = data['file_size']
             num_shards = data['num_shards']
             
             strategy = self._select_strategy(file_size)
             
             with self.lock:
-                available = [n for n in self.nodes if self.heartbeat.is_healthy(n)]
+                available = [n for n in self.nodes if n in self._healthy]
                 if len(available) < 3:
-                    return jsonify({'error': 'Insufficient nodes'}), 503
+                    return _reply({'error': 'Insufficient nodes'}, 503)
                 assignments = strategy.assign(num_shards, available)
+                urls = self._urls(assignments.values())
             
             logger.info(f"📋 Assigned {num_shards} shards using {strategy.name}")
-            return jsonify({'assignments': assignments, 'strategy': strategy.name})
+            # Map keys are shard ids as strings in either encoding
+            return _reply({'assignments': {str(sid): nid for sid, nid in assignments.items()},
+                           'strategy': strategy.name, 'nodes': urls})
         
         @self.app.route('/register_shard', methods=['POST'])
         def register_shard():
-            data = request.json
+            data = _payload()
             self.shard_map.register_shard(**data)
-            return jsonify({'status': 'ok'})
+            return _reply({'status': 'ok'})
+        
+        @self.app.route('/register_shards', methods=['POST'])
+        def register_shards():
+            data = _payload()
+            fid = data['file_id']
+            rows = [(fid, s['shard_id'], s['node_id'], s['checksum'], s['size'])
+                    for s in data['shards']]
+            # With the file record attached, the whole upload commits at once
+            if 'file' in data:
+                self.shard_map.commit_file(fid, rows=rows, **data['file'])
+            else:
+                self.shard_map.register_shards_bulk(rows)
+            return _reply({'status': 'ok', 'registered': len(rows)})
         
         @self.app.route('/register_file', methods=['POST'])
         def register_file():
-            data = request.json
+            data = _payload()
             self.shard_map.register_file(**data)
-            return jsonify({'status': 'ok'})
+            return _reply({'status': 'ok'})
         
         @self.app.route('/get_shard_locations', methods=['POST'])
         def get_locations():
-            file_id = request.json['file_id']
+            file_id = _payload()['file_id']
             locations = self.shard_map.get_shard_locations(file_id)
             if not locations:
-                return jsonify({'error': 'Not found'}), 404
-            return jsonify({'locations': locations})
+                return _reply({'error': 'Not found'}, 404)
+            with self.lock:
+                urls = self._urls(loc['node_id'] for loc in locations)
+            return _reply({'locations': locations, 'nodes': urls,
+                           'total_size': self.shard_map.get_file_size(file_id)})
         
         @self.app.route('/heartbeat', methods=['POST'])
         def heartbeat():
-            node_id = request.json['node_id']
+            node_id = _payload()['node_id']
             self.heartbeat.update_heartbeat(node_id)
-            return jsonify({'status': 'ok'})
+            with self.lock:
+                if node_id in self.nodes:
+                    self._healthy.add(node_id)
+                    self._failed.discard(node_id)
+            return _reply({'status': 'ok'})
         
         @self.app.route('/status', methods=['GET'])
         def status():
             with self.lock:
-                healthy = [n for n in self.nodes if self.heartbeat.is_healthy(n)]
-                failed = [n for n in self.nodes if not self.heartbeat.is_healthy(n)]
-            return jsonify({
-                'total_nodes': len(self.nodes),
-                'healthy_nodes': len(healthy),
+                total = len(self.nodes)
+                healthy = len(self._healthy)
+                failed = sorted(self._failed)
+            return _reply({
+                'total_nodes': total,
+                'healthy_nodes': healthy,
                 'failed_nodes': len(failed),
                 'failed_node_ids': failed,
                 'total_files': self.shard_map.get_file_count()
             })
     
+    def _urls(self, node_ids) -> Dict[str, str]:
+        """URLs of the given registered nodes (lock held)"""
+        return {nid: self.nodes[nid] for nid in set(node_ids) if nid in self.nodes}
+    
     def _select_strategy(self, file_size):
         return self.round_robin if file_size < 10*1024*1024 else self.erasure_coding
     
@@ -103,12 +152,22 @@ class MasterNode:
         logger.info("🛑 Master stopped")
     
     def _handle_failure(self, node_id):
+        with self.lock:
+            # The monitor also tracks ids that only ever sent heartbeats
+            if node_id not in self.nodes:
+                return
+            self._healthy.discard(node_id)
+            self._failed.add(node_id)
         logger.warning(f"⚠️ Node failure: {node_id}")
         affected = self.shard_map.get_files_on_node(node_id)
         for fid in affected:
             logger.info(f"🔧 Recovery needed: {fid}")
     
     def register_node(self, node_id, url):
+        # Never hold self.lock while taking the monitor's lock: its failure
+        # callback takes them in the opposite order
+        self.heartbeat.register_node(node_id)
         with self.lock:
             self.nodes[node_id] = url
-            self.heartbeat.register_node(node_id)
+            self._healthy.add(node_id)
+            self._failed.discard(node_id)
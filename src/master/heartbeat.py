@@ -1,36 +1,106 @@
 """Heartbeat Monitor - Failure detection"""
+import heapq
 import time
 import threading
-from typing import Dict, Callable, Optional
+from typing import Dict, Callable, List, Optional, Set, Tuple
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+NS = 1_000_000_000  # liveness is tracked in integer time.monotonic_ns()
+
+
+class DeadlineFailureDetector:
+    """Per-node heartbeat interarrival statistics
+    
+    Keeps an exponentially weighted mean of the gap between heartbeats.
+    A node is available until its latest heartbeat is older than the
+    mean gap plus acceptable_pause. All times are integer nanoseconds.
+    """
+    
+    def __init__(self, first_interval_ns, acceptable_pause_ns, alpha=0.1):
+        self.first_interval_ns = first_interval_ns
+        self.acceptable_pause_ns = acceptable_pause_ns
+        self.alpha = alpha
+        # time.monotonic_ns() of each node's latest heartbeat
+        self.last_heartbeat: Dict[str, int] = {}
+        self._mean: Dict[str, int] = {}
+    
+    def __contains__(self, node_id):
+        return node_id in self.last_heartbeat
+    
+    def reset(self, node_id, now):
+        """Start a node's history over, seeded with the nominal interval"""
+        self._mean[node_id] = self.first_interval_ns
+        self.last_heartbeat[node_id] = now
+    
+    def heartbeat(self, node_id, now):
+        dt = now - self.last_heartbeat[node_id]
+        self._mean[node_id] += int(self.alpha * (dt - self._mean[node_id]))
+        self.last_heartbeat[node_id] = now
+    
+    def deadline(self, node_id) -> int:
+        return (self.last_heartbeat[node_id] + self._mean[node_id]
+                + self.acceptable_pause_ns)
+    
+    def is_available(self, node_id, now) -> bool:
+        return node_id in self.last_heartbeat and now < self.deadline(node_id)
+
 
 class HeartbeatMonitor:
     def __init__(self, interval=10, timeout=30):
         self.interval = interval
         self.timeout = timeout
-        self.last_heartbeat: Dict[str, float] = {}
+        # With a steady beat every `interval`, a node is failed `timeout`
+        # after its last heartbeat; a jittery node earns a longer deadline.
+        # Refreshing a known node only touches its own dict keys, atomic
+        # enough under the GIL that the hot path takes no lock; self.lock
+        # guards everything else
+        self.detector = DeadlineFailureDetector(int(interval * NS),
+                                                int((timeout - interval) * NS))
+        self.last_heartbeat = self.detector.last_heartbeat
+        # Min-heap of (deadline, node_id) with one entry per live node; the
+        # monitor re-checks the detector when an entry comes due
+        self._deadlines: List[Tuple[int, str]] = []
+        self._failed: Set[str] = set()
         self.lock = threading.Lock()
+        self._wake = threading.Event()
         self.running = False
         self.monitor_thread = None
         self.on_failure_callback: Optional[Callable] = None
     
     def register_node(self, node_id):
         with self.lock:
-            self.last_heartbeat[node_id] = time.time()
+            self._track(node_id, time.monotonic_ns())
     
     def update_heartbeat(self, node_id):
+        if node_id in self.detector and node_id not in self._failed:
+            self.detector.heartbeat(node_id, time.monotonic_ns())
+            # The monitor re-reads the deadline after marking a node failed,
+            # so either it saw this beat or this check sees the failure
+            if node_id not in self._failed:
+                return
+        # Unknown or failed node: it needs a fresh deadline on the heap
         with self.lock:
-            self.last_heartbeat[node_id] = time.time()
+            self._track(node_id, time.monotonic_ns())
+    
+    def _track(self, node_id, now):
+        """Record a heartbeat and schedule the node's deadline (lock held)"""
+        if node_id in self.detector and node_id not in self._failed:
+            self.detector.heartbeat(node_id, now)
+            return
+        if node_id in self._failed:
+            self._failed.discard(node_id)
+            logger.info(f"💚 Node {node_id} recovered")
+        # The gap across an outage says nothing about the normal beat
+        self.detector.reset(node_id, now)
+        heapq.heappush(self._deadlines, (self.detector.deadline(node_id), node_id))
+        if self._deadlines[0][1] == node_id:
+            # New earliest deadline: the monitor may be sleeping past it
+            self._wake.set()
     
     def is_healthy(self, node_id) -> bool:
-        with self.lock:
-            if node_id not in self.last_heartbeat:
-                return False
-            elapsed = time.time() - self.last_heartbeat[node_id]
-            return elapsed < self.timeout
+        return self.detector.is_available(node_id, time.monotonic_ns())
     
     def start(self, on_failure_callback: Optional[Callable] = None):
         self.running = True
@@ -41,22 +111,38 @@ class HeartbeatMonitor:
     
     def stop(self):
         self.running = False
+        self._wake.set()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=2)
     
     def _monitor_loop(self):
-        failed = set()
+        # Sleep until the earliest deadline and only look at nodes whose
+        # deadline has passed; a node that beat since gets its deadline
+        # pushed back, the rest are declared failed
         while self.running:
-            time.sleep(self.interval)
+            self._wake.clear()
+            expired = []
             with self.lock:
-                now = time.time()
-                for nid, last in self.last_heartbeat.items():
-                    elapsed = now - last
-                    if elapsed > self.timeout and nid not in failed:
-                        logger.error(f"💔 Node {nid} failed ({elapsed:.1f}s)")
-                        failed.add(nid)
-                        if self.on_failure_callback:
-                            self.on_failure_callback(nid)
-                    elif elapsed < self.timeout and nid in failed:
-                        logger.info(f"💚 Node {nid} recovered")
-                        failed.remove(nid)
\ No newline at end of file
+                now = time.monotonic_ns()
+                heap = self._deadlines
+                while heap and heap[0][0] <= now:
+                    _, nid = heapq.heappop(heap)
+                    deadline = self.detector.deadline(nid)
+                    if deadline > now:
+                        heapq.heappush(heap, (deadline, nid))
+                        continue
+                    self._failed.add(nid)
+                    # A lock-free heartbeat may have landed since the read
+                    deadline = self.detector.deadline(nid)
+                    if deadline > now:
+                        self._failed.discard(nid)
+                        heapq.heappush(heap, (deadline, nid))
+                        continue
+                    expired.append((nid, now - self.last_heartbeat[nid]))
+                wait = (heap[0][0] - now) / NS if heap else self.interval
+            # Callbacks run outside the lock so they may take their own locks
+            for nid, elapsed in expired:
+                logger.error(f"💔 Node {nid} failed ({elapsed / NS:.1f}s)")
+                if self.on_failure_callback:
+                    self.on_failure_callback(nid)
+            self._wake.wait(wait)
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Shard Map - SQLite metadata storage"""
 import sqlite3
 import threading
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, Tuple
 from pathlib import Path
 from utils.logger import setup_logger
 
@@ -13,89 +13,112 @@ class ShardMap:
         self.db_path = db_path
         self.lock = threading.Lock()
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # One long-lived connection shared by all request threads (the
+        # Flask dev server spawns a thread per request), serialized by lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._file_count = None  # cached COUNT(*) of files, reset on writes
         self._init_db()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS shards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id TEXT NOT NULL,
-                shard_id INTEGER NOT NULL,
-                node_id TEXT NOT NULL,
-                checksum TEXT NOT NULL,
-                size INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(file_id, shard_id, node_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS files (
-                file_id TEXT PRIMARY KEY,
-                original_name TEXT NOT NULL,
-                total_size INTEGER NOT NULL,
-                num_shards INTEGER NOT NULL,
-                strategy TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_id ON shards(file_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_node_id ON shards(node_id)')
-        
-        conn.commit()
-        conn.close()
+        with self.lock:
+            cursor = self.conn.cursor()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS shards (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_id TEXT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    node_id TEXT NOT NULL,
+                    checksum TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(file_id, shard_id, node_id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    file_id TEXT PRIMARY KEY,
+                    original_name TEXT NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    num_shards INTEGER NOT NULL,
+                    strategy TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_id ON shards(file_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_node_id ON shards(node_id)')
+            
+            self.conn.commit()
         logger.info(f"💾 Initialized database: {self.db_path}")
     
+    def close(self):
+        with self.lock:
+            self.conn.close()
+    
     def register_file(self, file_id, original_name, total_size, num_shards, strategy):
         with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
+            self.conn.execute('''
                 INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             ''', (file_id, original_name, total_size, num_shards, strategy))
-            conn.commit()
-            conn.close()
+            self.conn.commit()
+            self._file_count = None
     
-    def register_shard(self, file_id, shard_id, node_id, checksum, size):
+    def commit_file(self, file_id, original_name, total_size, num_shards, strategy,
+                    rows: Iterable[Tuple[str, int, str, str, int]]):
+        """Record a file and all of its shard rows in a single transaction"""
         with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT OR REPLACE INTO shards 
+                    (file_id, shard_id, node_id, checksum, size)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (file_id, original_name, total_size, num_shards, strategy))
+            self._file_count = None
+    
+    def register_shard(self, file_id, shard_id, node_id, checksum, size):
+        self.register_shards_bulk([(file_id, shard_id, node_id, checksum, size)])
+    
+    def register_shards_bulk(self, rows: Iterable[Tuple[str, int, str, str, int]]):
+        """Insert many (file_id, shard_id, node_id, checksum, size) rows in one transaction"""
+        # The connection context rolls a failed batch back, so no partial
+        # rows linger for the next writer on this shared connection to commit
+        with self.lock, self.conn:
+            self.conn.executemany('''
                 INSERT OR REPLACE INTO shards 
                 (file_id, shard_id, node_id, checksum, size)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (file_id, shard_id, node_id, checksum, size))
-            conn.commit()
-            conn.close()
+            ''', rows)
     
     def get_shard_locations(self, file_id) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT shard_id, node_id, checksum, size
-            FROM shards WHERE file_id = ? ORDER BY shard_id
-        ''', (file_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT shard_id, node_id, checksum, size
+                FROM shards WHERE file_id = ? ORDER BY shard_id
+            ''', (file_id,)).fetchall()
         return [{'shard_id': r[0], 'node_id': r[1], 
                  'checksum': r[2], 'size': r[3]} for r in rows]
     
+    def get_file_size(self, file_id) -> Optional[int]:
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT total_size FROM files WHERE file_id = ?', (file_id,)).fetchone()
+        return row[0] if row else None
+    
     def get_files_on_node(self, node_id) -> List[str]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT file_id FROM shards WHERE node_id = ?', (node_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT DISTINCT file_id FROM shards WHERE node_id = ?', (node_id,)).fetchall()
         return [r[0] for r in rows]
     
     def get_file_count(self) -> int:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM files')
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        with self.lock:
+            if self._file_count is None:
+                self._file_count = self.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+            return self._file_count
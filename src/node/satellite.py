@@ -1,49 +1,105 @@
 """Satellite Node - Storage node"""
-import hashlib
-import time
+import os
+import tempfile
 import threading
 import requests
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wsgi import wrap_file
 from pathlib import Path
+from sharding.engine import CHECKSUMS, integrity_seal, tag_checksum
+from utils import wire
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+STREAM_BLOCK = 1024 * 1024  # bytes moved per read while storing a shard
+
+
+def _scan(dirpath, suffix):
+    """Count and total the sizes of files ending in suffix in one directory pass"""
+    count = size = 0
+    with os.scandir(dirpath) as it:
+        for entry in it:
+            if entry.name.endswith(suffix):
+                count += 1
+                size += entry.stat().st_size
+    return count, size
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    """Request handler without werkzeug's per-request access log line"""
+    
+    def log_request(self, code='-', size='-'):
+        pass
+
 
 class SatelliteNode:
-    def __init__(self, node_id, port, master_url, storage_dir='storage'):
+    def __init__(self, node_id, port, master_url, storage_dir='storage', seal_key=None):
         self.node_id = node_id
+        # Shared with clients; when set, every stored shard gets a seal
+        # that lets readers trust it without rehashing the data
+        if seal_key is None and os.environ.get('OSS_SEAL_KEY'):
+            seal_key = os.environ['OSS_SEAL_KEY'].encode()
+        self.seal_key = seal_key
         self.port = port
         self.master_url = master_url
-        self.storage_dir = Path(storage_dir) / node_id
+        self.storage_dir = (Path(storage_dir) / node_id).resolve()
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         self.app = Flask(__name__)
         self.url = f"http://localhost:{port}"
         self.running = False
+        self._stopped = threading.Event()
+        self.server = None
+        # Keep-alive session so heartbeats reuse one connection to the master
+        self.session = requests.Session()
         self._setup_routes()
     
     def _setup_routes(self):
         @self.app.route('/store', methods=['POST'])
         def store():
             try:
-                shard = request.files['shard']
-                fid = request.form['file_id']
-                sid = int(request.form['shard_id'])
-                expected = request.form['checksum']
-                
-                data = shard.read()
-                actual = hashlib.sha256(data).hexdigest()
-                
-                if actual != expected:
-                    return jsonify({'error': 'Checksum mismatch'}), 400
+                # Raw octet-stream body; identifiers travel in headers so
+                # no multipart parsing is needed
+                fid = request.headers['X-File-Id']
+                sid = int(request.headers['X-Shard-Id'])
+                expected = request.headers['X-Checksum']
+                algo = request.headers.get('X-Checksum-Algo', 'sha256')
+                if algo not in CHECKSUMS:
+                    return jsonify({'error': f'Unknown checksum: {algo}'}), 400
                 
+                # Stream the upload to a temp file in fixed-size blocks,
+                # hashing as we go, and only publish it if the checksum holds.
+                # Each upload gets its own temp file, removed unless published
                 path = self.storage_dir / f"{fid}_shard_{sid}.dat"
-                with open(path, 'wb') as f:
-                    f.write(data)
+                fd, tmp = tempfile.mkstemp(dir=self.storage_dir, prefix=f"{path.stem}.",
+                                           suffix='.part')
+                try:
+                    h = CHECKSUMS[algo]()
+                    size = 0
+                    with open(fd, 'wb') as f:
+                        while block := request.stream.read(STREAM_BLOCK):
+                            h.update(block)
+                            f.write(block)
+                            size += len(block)
+                    actual = h.hexdigest()
+                    
+                    if actual != expected:
+                        return jsonify({'error': 'Checksum mismatch'}), 400
+                    
+                    if self.seal_key is not None:
+                        seal = integrity_seal(self.seal_key, fid, sid,
+                                              tag_checksum(algo, actual), size)
+                        path.with_suffix('.seal').write_text(seal)
+                    os.replace(tmp, path)
+                    tmp = None
+                finally:
+                    if tmp is not None:
+                        os.unlink(tmp)
                 
                 logger.info(f"💾 {self.node_id}: Stored shard {sid} for {fid}")
                 return jsonify({'status': 'stored', 'node_id': self.node_id, 
-                              'size': len(data), 'checksum': actual})
+                              'size': size, 'checksum': actual})
             except Exception as e:
                 logger.error(f"❌ {self.node_id}: {e}")
                 return jsonify({'error': str(e)}), 500
@@ -52,42 +108,63 @@ class SatelliteNode:
         def retrieve(file_id, shard_id):
             try:
                 path = self.storage_dir / f"{file_id}_shard_{shard_id}.dat"
-                if not path.exists():
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
                     return jsonify({'error': 'Not found'}), 404
+                size = os.fstat(f.fileno()).st_size
+                headers = {'Content-Length': str(size)}
+                if self.seal_key is not None:
+                    try:
+                        headers['X-Integrity-Seal'] = path.with_suffix('.seal').read_text()
+                    except FileNotFoundError:
+                        pass  # stored before sealing was enabled
                 logger.info(f"📤 {self.node_id}: Sending shard {shard_id}")
-                return send_file(path, as_attachment=True)
+                # Raw body streamed straight from the file: no attachment
+                # headers, mimetype guess or ETag work per shard
+                return Response(wrap_file(request.environ, f, STREAM_BLOCK),
+                                mimetype='application/octet-stream',
+                                headers=headers, direct_passthrough=True)
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         
         @self.app.route('/status', methods=['GET'])
         def status():
-            shards = len(list(self.storage_dir.glob('*.dat')))
-            size = sum(f.stat().st_size for f in self.storage_dir.glob('*.dat'))
+            shards, size = _scan(self.storage_dir, '.dat')
             return jsonify({'node_id': self.node_id, 'shards': shards, 
                           'size_mb': size/(1024*1024)})
     
     def start(self):
         self.running = True
-        self.server_thread = threading.Thread(
-            target=lambda: self.app.run(host='0.0.0.0', port=self.port, 
-                                       threaded=True, use_reloader=False),
-            daemon=True
-        )
+        self._stopped.clear()
+        # Bind here so the port is accepting before start() returns; the
+        # threaded server speaks keep-alive HTTP/1.1 and can be shut down
+        self.server = make_server('0.0.0.0', self.port, self.app, threaded=True,
+                                  request_handler=_QuietRequestHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.server_thread.start()
         self.heartbeat_thread = threading.Thread(target=self._heartbeat, daemon=True)
         self.heartbeat_thread.start()
         logger.info(f"🛰️ {self.node_id} started on port {self.port}")
-        time.sleep(0.3)
     
     def stop(self):
         self.running = False
+        self._stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.session.close()
         logger.info(f"🛑 {self.node_id} stopped")
     
     def _heartbeat(self):
         while self.running:
             try:
-                requests.post(f"{self.master_url}/heartbeat", 
-                            json={'node_id': self.node_id}, timeout=2)
+                self.session.post(f"{self.master_url}/heartbeat", 
+                                  data=wire.pack({'node_id': self.node_id}),
+                                  headers={'Content-Type': wire.CONTENT_TYPE},
+                                  timeout=2)
             except:
                 pass
-            time.sleep(10)
+            # Returns at once when stop() is called instead of sleeping on
+            if self._stopped.wait(10):
+                break
@@ -0,0 +1,30 @@
+"""Control-plane wire format"""
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional; JSON is used when it is not installed
+    msgpack = None
+
+MSGPACK = 'application/msgpack'
+CONTENT_TYPE = MSGPACK if msgpack is not None else 'application/json'
+
+
+class UnsupportedFormat(ValueError):
+    """A body arrived in an encoding this process cannot decode"""
+
+
+def pack(obj) -> bytes:
+    """Encode obj in this process's preferred format (CONTENT_TYPE)"""
+    if msgpack is not None:
+        return msgpack.packb(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def unpack(raw: bytes, content_type: str):
+    """Decode a body sent with the given mimetype, msgpack or JSON"""
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise UnsupportedFormat("msgpack body received but msgpack is not installed")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
@@ -0,0 +1,20 @@
+"""Shared test fixtures"""
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import fs_lite_cli
+
+
+@pytest.fixture
+def fs_lite_data(tmp_path, monkeypatch):
+    """Point fs_lite_cli's data files at a fresh temporary directory"""
+    base = tmp_path / 'fs_lite_data'
+    monkeypatch.setattr(fs_lite_cli, 'BASE_DIR', base)
+    monkeypatch.setattr(fs_lite_cli, 'NODES_DIR', base / 'nodes')
+    monkeypatch.setattr(fs_lite_cli, 'METADATA_FILE', base / 'metadata.json')
+    monkeypatch.setattr(fs_lite_cli, 'METADATA_WAL', base / 'metadata.wal')
+    monkeypatch.setattr(fs_lite_cli, 'NODE_STATE_FILE', base / 'nodes_state.json')
+    monkeypatch.setattr(fs_lite_cli, 'VERIFIED_LOG', base / 'verified.log')
+    return base
@@ -0,0 +1,33 @@
+"""Master coordinator tests"""
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from master.coordinator import MasterNode
+
+
+def _status(app):
+    return app.get('/status').get_json()
+
+
+def test_liveness_bookkeeping():
+    with tempfile.TemporaryDirectory() as tmp:
+        master = MasterNode(db_path=str(Path(tmp) / 'master.db'))
+        app = master.app.test_client()
+        master.register_node('sat_00', 'http://localhost:5001')
+        master.register_node('sat_01', 'http://localhost:5002')
+        assert _status(app)['healthy_nodes'] == 2
+        
+        # Heartbeats and failures of unregistered ids are not counted
+        assert app.post('/heartbeat', json={'node_id': 'ghost'}).status_code == 200
+        master._handle_failure('ghost')
+        master._handle_failure('sat_01')
+        status = _status(app)
+        assert (status['total_nodes'], status['healthy_nodes'], status['failed_nodes']) == (2, 1, 1)
+        assert status['failed_node_ids'] == ['sat_01']
+        
+        app.post('/heartbeat', json={'node_id': 'sat_01'})
+        status = _status(app)
+        assert (status['healthy_nodes'], status['failed_nodes']) == (2, 0)
+        master.shard_map.close()
@@ -0,0 +1,49 @@
+"""Erasure coding tests"""
+import itertools
+import os
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import fs_lite_cli
+from fs_lite_cli import ErasureCoder
+
+
+@pytest.mark.parametrize('k,m', [(1, 1), (2, 1), (3, 2), (4, 2), (6, 3)])
+def test_decode_from_every_k_subset(k, m):
+    coder = ErasureCoder(k, m)
+    # A length that is not a multiple of k exercises the padded last shard
+    block = os.urandom(k * 37 + 1)
+    shards = coder.encode(block)
+    assert len(shards) == k + m
+    assert len({len(s) for s in shards}) == 1
+    
+    for rows in itertools.combinations(range(k + m), k):
+        survivors = {i: shards[i] for i in rows}
+        assert coder.decode(survivors, len(block)) == block
+
+
+def test_decode_needs_k_shards():
+    coder = ErasureCoder(4, 2)
+    shards = coder.encode(b'E' * 100)
+    with pytest.raises(ValueError):
+        coder.decode({i: shards[i] for i in (0, 2, 5)}, 100)
+
+
+def test_invalid_code():
+    with pytest.raises(ValueError):
+        ErasureCoder(0, 2)
+
+
+def test_erasure_upload_survives_m_offline_nodes(fs_lite_data, tmp_path):
+    fs = fs_lite_cli.FSLite(num_nodes=6)
+    src = tmp_path / 'data.bin'
+    src.write_bytes(os.urandom(10000 + 7))
+    fs.upload_file(str(src), chunk_size=1000, erasure=(4, 2))
+    fs.node_offline('sat_02')
+    fs.node_offline('sat_05')
+    
+    out = tmp_path / 'out.bin'
+    fs.download_file('data.bin', str(out))
+    assert out.read_bytes() == src.read_bytes()
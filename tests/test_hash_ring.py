@@ -0,0 +1,36 @@
+"""Consistent-hash placement tests"""
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import fs_lite_cli
+
+CHUNKS = 2000
+
+
+def _placement(fs, replication=3, filename='data.bin'):
+    select = fs._selector('hash', replication, filename)
+    return [tuple(node.name for node in select(i)) for i in range(CHUNKS)]
+
+
+def test_hash_replicas_are_distinct_nodes(fs_lite_data):
+    fs = fs_lite_cli.FSLite(num_nodes=5)
+    for replication in (1, 3, 5, 7):
+        for names in _placement(fs, replication):
+            assert len(names) == min(replication, 5)
+            assert len(set(names)) == len(names)
+
+
+def test_hash_placement_is_stable_across_instances(fs_lite_data):
+    first = _placement(fs_lite_cli.FSLite(num_nodes=6))
+    assert _placement(fs_lite_cli.FSLite(num_nodes=6)) == first
+    assert _placement(fs_lite_cli.FSLite(num_nodes=6), filename='other.bin') != first
+
+
+def test_adding_a_node_moves_a_bounded_share_of_chunks(fs_lite_data):
+    before = _placement(fs_lite_cli.FSLite(num_nodes=8), replication=1)
+    after = _placement(fs_lite_cli.FSLite(num_nodes=9), replication=1)
+    moved = [new for old, new in zip(before, after) if old != new]
+    # Ideally 1/9 of the chunks move, and only onto the new node
+    assert 0 < len(moved) < CHUNKS * 2 / 9
+    assert set(moved) == {('sat_09',)}
@@ -0,0 +1,44 @@
+"""Heartbeat monitor tests"""
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from master.heartbeat import NS, DeadlineFailureDetector, HeartbeatMonitor
+
+
+def test_heartbeat_racing_failure_rearms_node():
+    monitor = HeartbeatMonitor(interval=1, timeout=3)
+    monitor.register_node('sat_00')
+    beat = monitor.detector.heartbeat
+    
+    def racing(node_id, now):
+        # The monitor declares the node failed between the lock-free
+        # check and the timestamp update
+        monitor._failed.add(node_id)
+        monitor._deadlines.clear()
+        beat(node_id, now)
+    
+    monitor.detector.heartbeat = racing
+    monitor.update_heartbeat('sat_00')
+    assert 'sat_00' not in monitor._failed
+    assert [nid for _, nid in monitor._deadlines] == ['sat_00']
+
+
+def test_detector_deadline_follows_heartbeat_gaps():
+    detector = DeadlineFailureDetector(10 * NS, 20 * NS)
+    detector.reset('sat_00', 0)
+    # A steady beat fails a node `timeout` (interval + pause) after it
+    assert detector.deadline('sat_00') == 30 * NS
+    assert detector.is_available('sat_00', 29 * NS)
+    assert not detector.is_available('sat_00', 30 * NS)
+    
+    # Late beats stretch the expected gap and with it the deadline
+    now = 0
+    for _ in range(20):
+        now += 20 * NS
+        detector.heartbeat('sat_00', now)
+    assert detector.deadline('sat_00') - now > 35 * NS
+    
+    detector.reset('sat_00', now)
+    assert detector.deadline('sat_00') == now + 30 * NS
+    assert not detector.is_available('sat_01', now)
@@ -0,0 +1,60 @@
+"""Integrity seal tests"""
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from client.oss_client import OSSClient
+from node.satellite import SatelliteNode
+from sharding.engine import checksum_hex
+
+KEY = b'test-key'
+
+
+def _store(app, data, checksum):
+    resp = app.post('/store', data=data,
+                    headers={'X-File-Id': 'f1', 'X-Shard-Id': '0',
+                             'X-Checksum': checksum, 'X-Checksum-Algo': 'sha256'})
+    assert resp.status_code == 200
+
+
+def _retrieve(app):
+    resp = app.get('/retrieve/f1/0')
+    body, seal = resp.get_data(), resp.headers.get('X-Integrity-Seal')
+    resp.close()
+    return body, seal
+
+
+def test_seal_skips_rehash():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SatelliteNode('sat_00', 0, 'http://localhost:1', storage_dir=tmp,
+                            seal_key=KEY).app.test_client()
+        data = b'C' * 3000
+        checksum = checksum_hex(data)
+        _store(app, data, checksum)
+        
+        client = OSSClient(verify_mode='seal', seal_key=KEY)
+        rehashed = []
+        client.engine.verify_shard = lambda d, e: rehashed.append(d) or False
+        body, seal = _retrieve(app)
+        loc = {'shard_id': 0, 'checksum': checksum, 'size': len(data)}
+        assert seal
+        assert client._intact('f1', loc, body, seal)
+        assert not rehashed
+
+
+def test_seal_rejects_truncated_shard():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SatelliteNode('sat_00', 0, 'http://localhost:1', storage_dir=tmp,
+                            seal_key=KEY).app.test_client()
+        data = b'D' * 3000
+        checksum = checksum_hex(data)
+        _store(app, data, checksum)
+        with open(Path(tmp) / 'sat_00' / 'f1_shard_0.dat', 'r+b') as f:
+            f.truncate(100)
+        
+        body, seal = _retrieve(app)
+        loc = {'shard_id': 0, 'checksum': checksum, 'size': len(data)}
+        assert len(body) == 100
+        assert not OSSClient(verify_mode='seal', seal_key=KEY)._intact('f1', loc, body, seal)
+        assert not OSSClient(verify_mode='full')._intact('f1', loc, body, seal)
@@ -0,0 +1,52 @@
+"""OSS client transfer scheduling tests"""
+import threading
+from pathlib import Path
+import pytest
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from client.oss_client import OSSClient
+
+
+def test_parallel_submits_items_as_they_are_produced():
+    client = OSSClient(max_workers=4)
+    started = threading.Event()
+    
+    def items():
+        yield 0
+        # The first item must already be transferring before the next is produced
+        assert started.wait(5)
+        yield 1
+        yield 2
+    
+    def fn(item):
+        started.set()
+        return item * 10
+    
+    try:
+        assert client._parallel(fn, items()) == [0, 10, 20]
+    finally:
+        client.close()
+
+
+def test_parallel_waits_for_submitted_items_when_producer_fails():
+    client = OSSClient(max_workers=4)
+    done = []
+    release = threading.Event()
+    
+    def items():
+        yield 0
+        raise RuntimeError('producer failed')
+    
+    def fn(item):
+        release.wait(5)
+        done.append(item)
+    
+    try:
+        timer = threading.Timer(0.05, release.set)
+        timer.start()
+        with pytest.raises(RuntimeError):
+            client._parallel(fn, items())
+        assert done == [0]
+    finally:
+        client.close()
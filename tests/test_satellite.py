@@ -0,0 +1,45 @@
+"""Satellite node tests"""
+import io
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from node.satellite import SatelliteNode
+from sharding.engine import checksum_hex
+
+
+class _BrokenStream(io.BytesIO):
+    """Request body that fails part way, like a client dropping the connection"""
+    
+    def read(self, size=-1):
+        if self.tell():
+            raise ConnectionResetError('client went away')
+        return super().read(10)
+    
+    def readinto(self, buf):
+        data = self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+
+def _headers(checksum):
+    return {'X-File-Id': 'f1', 'X-Shard-Id': '0', 'X-Checksum': checksum,
+            'Content-Length': '1000'}
+
+
+def test_store_leaves_no_temp_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        node = SatelliteNode('sat_00', 0, 'http://localhost:1', storage_dir=tmp)
+        app = node.app.test_client()
+        data = b'G' * 1000
+        
+        resp = app.post('/store', data=data, headers=_headers('0' * 64))
+        assert resp.status_code == 400
+        resp = app.post('/store', input_stream=_BrokenStream(b'F' * 1000), headers=_headers('0' * 64))
+        assert resp.status_code == 500
+        assert list(node.storage_dir.iterdir()) == []
+        
+        resp = app.post('/store', data=data, headers=_headers(checksum_hex(data)))
+        assert resp.status_code == 200
+        assert [p.name for p in node.storage_dir.iterdir()] == ['f1_shard_0.dat']
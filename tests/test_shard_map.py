@@ -0,0 +1,46 @@
+"""Shard map tests"""
+import sqlite3
+import tempfile
+from pathlib import Path
+import pytest
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from master.shard_map import ShardMap
+
+
+def test_register_shards_bulk():
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_map = ShardMap(str(Path(tmp) / 'master.db'))
+        rows = [('f1', sid, f'sat_{sid % 3:02d}', 'c' * 64, 1024) for sid in range(10)]
+        shard_map.register_shards_bulk(rows)
+        shard_map.register_shard('f2', 0, 'sat_01', 'd' * 64, 10)
+        
+        locations = shard_map.get_shard_locations('f1')
+        assert [loc['shard_id'] for loc in locations] == list(range(10))
+        assert locations[4]['node_id'] == 'sat_01'
+        assert sorted(shard_map.get_files_on_node('sat_01')) == ['f1', 'f2']
+        shard_map.close()
+
+
+def test_commit_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_map = ShardMap(str(Path(tmp) / 'master.db'))
+        rows = [('f1', sid, 'sat_00', 'c' * 64, 1024) for sid in range(3)]
+        shard_map.commit_file('f1', 'a.bin', 3072, 3, 'round_robin', rows)
+        
+        assert shard_map.get_file_count() == 1
+        assert len(shard_map.get_shard_locations('f1')) == 3
+        shard_map.close()
+
+
+def test_failed_bulk_insert_rolls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_map = ShardMap(str(Path(tmp) / 'master.db'))
+        rows = [('f1', 0, 'sat_00', 'c' * 64, 10), ('f1', 1, 'sat_01', None, 10)]
+        with pytest.raises(sqlite3.IntegrityError):
+            shard_map.register_shards_bulk(rows)
+        shard_map.register_file('f2', 'b.bin', 10, 1, 'round_robin')
+        
+        assert shard_map.get_shard_locations('f1') == []
+        shard_map.close()
@@ -1,11 +1,13 @@
 """Sharding tests"""
+import os
 import pytest
 import tempfile
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
-from sharding.engine import ShardingEngine
+from sharding import engine as engine_module
+from sharding.engine import ShardingEngine, checksum_hex
 
 
 def test_shard_file():
@@ -47,3 +49,45 @@ def test_reconstruct():
     finally:
         Path(test_file).unlink()
 
+
+def test_mapped_shards():
+    engine = ShardingEngine(shard_size=1024, hash_workers=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_file = Path(tmp) / 'data.bin'
+        test_data = bytes(range(256)) * 20
+        test_file.write_bytes(test_data)
+        
+        with engine.mapped_shards(str(test_file)) as shards:
+            shards = list(shards)
+            assert [sid for sid, _, _ in shards] == list(range(engine.num_shards(len(test_data))))
+            assert b''.join(view for _, view, _ in shards) == test_data
+            for _, view, checksum in shards:
+                assert checksum == checksum_hex(view, engine.checksum)
+        # Views are released once the block exits
+        with pytest.raises(ValueError):
+            bytes(shards[0][1])
+        
+        empty = Path(tmp) / 'empty.bin'
+        empty.write_bytes(b'')
+        with engine.mapped_shards(str(empty)) as shards:
+            assert list(shards) == []
+
+
+@pytest.mark.parametrize('pwrite', [True, False])
+def test_write_shard_at_out_of_order(pwrite, monkeypatch):
+    if not pwrite:
+        # Exercise the seek-and-write path used where os.pwrite is missing
+        monkeypatch.delattr(engine_module.os, 'pwrite', raising=False)
+    engine = ShardingEngine(shard_size=1024)
+    test_data = bytes(range(256)) * 11
+    shards = [(sid, test_data[off:off + 1024])
+              for sid, off in enumerate(range(0, len(test_data), 1024))]
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / 'out' / 'data.bin'
+        fd = engine.open_output(str(output), len(test_data))
+        try:
+            for sid, data in reversed(shards):
+                engine.write_shard_at(fd, sid, memoryview(data))
+        finally:
+            os.close(fd)
+        assert output.read_bytes() == test_data
@@ -0,0 +1,118 @@
+"""Verified-replica cache and trusted download tests"""
+import os
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import fs_lite_cli
+from fs_lite_cli import VerifiedCache
+
+
+def _upload(fs, tmp_path):
+    src = tmp_path / 'data.bin'
+    src.write_bytes(os.urandom(4000))
+    fs.upload_file(str(src), chunk_size=1000, replication=2)
+    return src
+
+
+def _primary(fs, i=0):
+    """Metadata record and on-disk path of chunk i's first replica"""
+    record = fs.metadata['data.bin']['chunks'][str(i)][0]
+    return record, fs._node_by_name(record['node']).path / record['chunk_filename']
+
+
+def _rewrite(path, data):
+    """Rewrite a replica and move its mtime on, as a later write would"""
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def _count_hashes(monkeypatch):
+    calls = []
+    real = fs_lite_cli.checksum_bytes
+    monkeypatch.setattr(fs_lite_cli, 'checksum_bytes',
+                        lambda data, algo='sha256': calls.append(1) or real(data, algo))
+    return calls
+
+
+def test_untouched_replica_is_trusted_without_rehashing(fs_lite_data, tmp_path, monkeypatch):
+    fs = fs_lite_cli.FSLite(num_nodes=4)
+    src = _upload(fs, tmp_path)
+    calls = _count_hashes(monkeypatch)
+    
+    out = tmp_path / 'out.bin'
+    fs.download_file('data.bin', str(out), trust_local=True)
+    assert out.read_bytes() == src.read_bytes()
+    assert calls == []
+    
+    fs.download_file('data.bin', str(out))
+    assert len(calls) == 4  # a full download still hashes every chunk
+
+
+def test_corrupt_rewritten_replica_fails_over_under_trust_local(fs_lite_data, tmp_path):
+    fs = fs_lite_cli.FSLite(num_nodes=4)
+    src = _upload(fs, tmp_path)
+    record, path = _primary(fs)
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xFF
+    _rewrite(path, bytes(data))
+    
+    out = tmp_path / 'out.bin'
+    fs.download_file('data.bin', str(out), trust_local=True)
+    assert out.read_bytes() == src.read_bytes()
+    assert (record['node'], record['chunk_filename'], path.stat().st_mtime_ns) not in fs._verified
+
+
+def test_rewritten_replica_is_remembered_across_instances(fs_lite_data, tmp_path, monkeypatch):
+    fs = fs_lite_cli.FSLite(num_nodes=4)
+    _upload(fs, tmp_path)
+    record, path = _primary(fs)
+    _rewrite(path, path.read_bytes())
+    out = tmp_path / 'out.bin'
+    fs.download_file('data.bin', str(out))
+    key = (record['node'], record['chunk_filename'], path.stat().st_mtime_ns)
+    assert key in fs._verified
+    
+    # A fresh instance reloads the log and accepts the replica unhashed
+    fs = fs_lite_cli.FSLite(num_nodes=4)
+    calls = _count_hashes(monkeypatch)
+    fs.download_file('data.bin', str(out), trust_local=True)
+    assert calls == []
+    
+    # Once the replica changes again the old entry no longer vouches for it
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xFF
+    _rewrite(path, bytes(data))
+    assert (record['node'], record['chunk_filename'], path.stat().st_mtime_ns) not in fs._verified
+    assert not fs._verify(bytes(data), path.stat().st_mtime_ns, record, True, 'sha256')
+
+
+def test_init_nodes_clears_the_cache(fs_lite_data, tmp_path):
+    fs = fs_lite_cli.FSLite(num_nodes=4)
+    _upload(fs, tmp_path)
+    record, path = _primary(fs)
+    _rewrite(path, path.read_bytes())
+    fs.download_file('data.bin', str(tmp_path / 'out.bin'))
+    key = (record['node'], record['chunk_filename'], path.stat().st_mtime_ns)
+    assert key in fs._verified
+    
+    fs.init_nodes(4)
+    assert key not in fs._verified
+    assert not fs_lite_cli.VERIFIED_LOG.exists()
+    assert key not in fs_lite_cli.FSLite(num_nodes=4)._verified
+
+
+def test_cache_survives_log_rewrite(tmp_path):
+    log = tmp_path / 'verified.log'
+    cache = VerifiedCache(log, capacity=4)
+    keys = [('sat_01', f'chunk_{i}', i) for i in range(12)]
+    for key in keys:
+        cache.add(key)
+        cache.flush()
+    # The log was compacted rather than growing past twice the capacity
+    assert len(log.read_bytes().splitlines()) <= 8
+    
+    reloaded = VerifiedCache(log, capacity=4)
+    assert all(key in reloaded for key in keys[-4:])
+    assert not any(key in reloaded for key in keys[:-4])
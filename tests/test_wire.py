@@ -0,0 +1,51 @@
+"""Control-plane wire format tests"""
+import tempfile
+from pathlib import Path
+import pytest
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from master.coordinator import MasterNode
+from utils import wire
+
+MESSAGE = {'file_id': 'f1', 'shards': [{'shard_id': 0, 'size': 10, 'checksum': 'c' * 64}],
+           'nodes': {'sat_00': 'http://localhost:5001'}}
+
+
+def test_pack_round_trip():
+    assert wire.unpack(wire.pack(MESSAGE), wire.CONTENT_TYPE) == MESSAGE
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip('msgpack')
+    raw = msgpack.packb(MESSAGE)
+    assert wire.unpack(raw, wire.MSGPACK) == MESSAGE
+
+
+def test_reply_honours_accept():
+    with tempfile.TemporaryDirectory() as tmp:
+        master = MasterNode(db_path=str(Path(tmp) / 'master.db'))
+        app = master.app.test_client()
+        
+        resp = app.get('/status', headers={'Accept': wire.MSGPACK})
+        expected = wire.MSGPACK if wire.msgpack is not None else 'application/json'
+        assert resp.mimetype == expected
+        assert wire.unpack(resp.get_data(), resp.mimetype)['total_files'] == 0
+        
+        resp = app.get('/status')
+        assert resp.mimetype == 'application/json'
+        master.shard_map.close()
+
+
+def test_undecodable_body_is_415(monkeypatch):
+    monkeypatch.setattr(wire, 'msgpack', None)
+    with tempfile.TemporaryDirectory() as tmp:
+        master = MasterNode(db_path=str(Path(tmp) / 'master.db'))
+        app = master.app.test_client()
+        
+        resp = app.post('/heartbeat', data=b'\x81\xa7node_id\xa6sat_00',
+                        headers={'Content-Type': wire.MSGPACK, 'Accept': wire.MSGPACK})
+        assert resp.status_code == 415
+        assert resp.mimetype == 'application/json'
+        assert 'msgpack' in resp.get_json()['error']
+        master.shard_map.close()